@@ -1,73 +1,643 @@
 import spotipy
 from spotipy.oauth2 import SpotifyOAuth
-import pandas as pd
+from spotipy.exceptions import SpotifyException
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import requests
 import base64
+import math
+import time
+import csv
+import re
+from throttle import AdaptiveThrottle
+from metrics import metrics
+from search_cache import SearchCache, normalize_key
+from import_journal import ImportJournal
+from track_writer import read_tracks, output_file
+from playlist_sync import SYNC_BATCH_SIZE, load_sync_entry, save_sync_entry, plan_sync
+from matching import best_candidate, score_candidate, strict_query, relaxed_query
 from config import (
     CLIENT_ID,
     CLIENT_SECRET,
     REDIRECT_URI,
     toggle_match_ratio,
-    playlist_name
+    playlist_name,
+    search_workers,
+    api_rate_limit,
+    api_rate_limit_max,
+    api_breaker_threshold,
+    api_breaker_cooldown,
+    search_cache_path,
+    search_cache_max_entries,
+    search_cache_negative_ttl_days,
+    match_candidates,
+    min_match_score,
+    export_match_report,
+    import_journal_dir,
+    playlist_sync,
+    sync_state_path
 )
 
 SCOPE = 'playlist-read-private playlist-modify-public playlist-modify-private'
 
-sp = spotipy.Spotify(auth_manager=SpotifyOAuth(
-    client_id=CLIENT_ID,
-    client_secret=CLIENT_SECRET,
-    redirect_uri=REDIRECT_URI,
-    scope=SCOPE,
-    open_browser=True,
-    cache_path=".spotify_token"
-))
-
-def create_playlist_from_csv(csv_file, playlist_name, min_match_ratio=toggle_match_ratio):
-    """Create a Spotify playlist from a CSV file containing track information."""
-    desc = base64.b64decode('UGxheWxpc3QgY3JlYXRlZCB1c2luZyB0aGUgU3BvdGlmeSBwbGF5bGlzdCBpbXBvcnRlciBmb3VuZCBhdCBodHRwczovL2dpdGh1Yi5jb20vR3JpZmYtS3lhbC9TcG90aWZ5X1BsYXlsaXN0LUV4dHJhY3Rvcg==').decode('utf-8')
-    user_id = sp.me()['id']
-    df = pd.read_csv(csv_file)
-    total_tracks = len(df)
+# Number of times a request is retried after a 429 or a 5xx response
+API_RETRIES = 5
+
+# Seconds before the access token expires that the background refresher renews it
+TOKEN_REFRESH_MARGIN = 300
+
+# Maximum number of IDs accepted by a single call to the tracks endpoint
+TRACKS_BATCH_SIZE = 50
+
+TRACK_ID_PATTERN = re.compile(r'(?:/track/|spotify:track:)([A-Za-z0-9]{22})')
+
+def build_client(auth_manager=None, auth=None, pool_size=search_workers, throttle=None):
+    """Create a Spotify client whose connection pool is shared by every search worker.
+
+    spotipy's own retries are turned off so that 429s reach call_api, which pauses
+    all workers together. Calls go through the given throttle, or the shared
+    api_throttle when there is none.
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    client = spotipy.Spotify(
+        auth=auth,
+        auth_manager=auth_manager,
+        requests_session=session,
+        retries=0,
+        status_retries=0
+    )
+    client.throttle = throttle
+    return client
+
+sp = None
+client_lock = threading.Lock()
+
+def get_client():
+    """The shared Spotify client, created (and authorised) the first time it is needed."""
+    global sp
+    with client_lock:
+        if sp is None:
+            sp = build_client(auth_manager=SpotifyOAuth(
+                client_id=CLIENT_ID,
+                client_secret=CLIENT_SECRET,
+                redirect_uri=REDIRECT_URI,
+                scope=SCOPE,
+                open_browser=True,
+                cache_path=".spotify_token"
+            ))
+        return sp
+
+def refresh_token_in_background():
+    """Keep the cached access token fresh from a daemon thread, so no import waits on a refresh.
+
+    Only a token saved by an earlier login is refreshed; the first login still happens
+    when the import starts.
+    """
+    auth_manager = get_client().auth_manager
+    
+    def refresher():
+        while True:
+            token = auth_manager.cache_handler.get_cached_token()
+            if not token or not token.get('refresh_token'):
+                return
+            wait = token['expires_at'] - TOKEN_REFRESH_MARGIN - time.time()
+            if wait > 0:
+                time.sleep(wait)
+                continue
+            try:
+                auth_manager.refresh_access_token(token['refresh_token'])
+                metrics.count("api.token_refreshes")
+            except Exception as e:
+                print(f"Could not refresh the Spotify token in the background: {e}")
+                return
+    
+    threading.Thread(target=refresher, name="token-refresh", daemon=True).start()
+
+def report_throughput(stats):
+    for name, value in stats.items():
+        metrics.gauge(f"api.{name}", value)
+    print(f"Spotify API: {stats['requests_per_second']:.1f} requests/s (limit {stats['rate_limit']:.1f}/s, "
+          f"{stats['concurrency']} at a time, {stats['latency_ms']:.0f}ms latency)")
+
+api_throttle = AdaptiveThrottle(
+    api_rate_limit,
+    max_rate=api_rate_limit_max,
+    max_concurrency=search_workers,
+    breaker_threshold=api_breaker_threshold,
+    cooldown=api_breaker_cooldown,
+    on_report=report_throughput
+)
+
+def throttle_for(client):
+    """The throttle a client's calls go through."""
+    return getattr(client, 'throttle', None) or api_throttle
+
+def call_api(func, *args, **kwargs):
+    """Call a spotipy method through its client's adaptive throttle, honouring Retry-After.
+
+    429s, 5xx responses, timeouts and dropped connections are retried and reported to
+    the throttle, which slows down or trips its circuit breaker when they keep coming.
+    """
+    name = getattr(func, '__name__', 'call')
+    throttle = throttle_for(getattr(func, '__self__', None))
+    for attempt in range(API_RETRIES + 1):
+        if attempt:
+            metrics.count("api.retries")
+        with metrics.span("api.wait"):
+            throttle.acquire()
+        metrics.count("api.calls")
+        metrics.count(f"api.calls.{name}")
+        start = time.perf_counter()
+        try:
+            with metrics.span(f"api.{name}"):
+                result = func(*args, **kwargs)
+        except SpotifyException as e:
+            metrics.count(f"api.errors.{e.http_status}")
+            if e.http_status == 429:
+                retry_after = float((e.headers or {}).get('Retry-After', 1))
+                print(f"Rate limited by Spotify, pausing all requests for {retry_after:.0f}s ...")
+                throttle.failure(retry_after)
+            elif e.http_status and e.http_status >= 500:
+                throttle.failure()
+            else:
+                throttle.success(time.perf_counter() - start)
+                raise
+            if attempt == API_RETRIES:
+                raise
+            if e.http_status != 429:
+                time.sleep(2 ** attempt)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            metrics.count("api.errors.connection")
+            throttle.failure()
+            if attempt == API_RETRIES:
+                raise
+            time.sleep(2 ** attempt)
+        except BaseException:
+            throttle.release()
+            raise
+        else:
+            throttle.success(time.perf_counter() - start)
+            return result
+
+def open_search_cache():
+    """Open the search cache configured in config.py, or return None when it is disabled."""
+    if not search_cache_path:
+        return None
+    return SearchCache(
+        search_cache_path,
+        max_entries=search_cache_max_entries,
+        negative_ttl=search_cache_negative_ttl_days * 24 * 3600
+    )
+
+def close_search_cache(cache):
+    """Report the cache's hit rate and close it."""
+    stats = cache.stats()
+    metrics.count("cache.hits", stats['hits'])
+    metrics.count("cache.misses", stats['misses'])
+    print(f"Search cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate)")
+    cache.close()
+
+def describe_match(track_id, method, candidate=None, score=None, seconds=0.0):
+    """Build the record kept for each row: the chosen ID plus how it was found."""
+    return {
+        "id": track_id,
+        "method": method,
+        "score": score,
+        "matched_title": candidate.get('name', '') if candidate else '',
+        "matched_artists": ', '.join(artist['name'] for artist in candidate.get('artists', [])) if candidate else '',
+        "seconds": seconds
+    }
+
+def find_candidate(client, title, artist, query):
+    """Run one search and return (best candidate, score, seconds taken)."""
+    start = time.perf_counter()
+    results = call_api(client.search, q=query, type='track', limit=match_candidates)
+    candidate, score = best_candidate(title, artist, results['tracks']['items'])
+    return candidate, score, time.perf_counter() - start
+
+@metrics.timed("import.search")
+def search_tracks(rows, client=None, workers=search_workers, cache=None, min_score=min_match_score, on_match=None):
+    """Match (title, artist) rows concurrently, returning a match record per row in row order.
+
+    Every row is first searched with a strict track:/artist: query and the returned
+    candidates are scored. Only rows whose best candidate scores below min_score are
+    searched again with a relaxed query. on_match is called with (index, match) as soon
+    as each row's match is decided.
+    """
+    client = client or get_client()
+    matches = [None] * len(rows)
+    
+    def decide(index, match):
+        matches[index] = match
+        if on_match:
+            on_match(index, match)
+    
+    def accept(index, candidate, score, seconds, method):
+        track_id = candidate['id'] if candidate and score >= min_score else None
+        if cache:
+            cache.put(*rows[index], track_id)
+        decide(index, describe_match(track_id, method, candidate, score, seconds))
+    
+    pending = []
+    for index, (title, artist) in enumerate(rows):
+        if cache:
+            found, track_id = cache.get(title, artist)
+            if found:
+                decide(index, describe_match(track_id, "cache"))
+                continue
+        pending.append(index)
+    
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        strict = executor.map(lambda index: find_candidate(client, *rows[index], strict_query(*rows[index])), pending)
+        best = {}
+        for index, (candidate, score, seconds) in zip(pending, strict):
+            if score >= min_score:
+                accept(index, candidate, score, seconds, "strict")
+            else:
+                best[index] = (candidate, score, seconds)
+        
+        leftovers = list(best)
+        if leftovers:
+            print(f"Retrying {len(leftovers)} tracks with relaxed queries ...")
+        relaxed = executor.map(lambda index: find_candidate(client, *rows[index], relaxed_query(*rows[index])), leftovers)
+        for index, (candidate, score, seconds) in zip(leftovers, relaxed):
+            previous_candidate, previous_score, previous_seconds = best[index]
+            if score > previous_score:
+                accept(index, candidate, score, previous_seconds + seconds, "relaxed")
+            else:
+                accept(index, previous_candidate, previous_score, previous_seconds + seconds, "strict")
+    
+    return matches
+
+def parse_track_id(url):
+    """Pull the track ID out of a Spotify track URL or URI, or return None."""
+    if not isinstance(url, str):
+        return None
+    match = TRACK_ID_PATTERN.search(url)
+    return match.group(1) if match else None
+
+@metrics.timed("import.validate_ids")
+def validate_track_ids(track_ids, client=None):
+    """Look up track IDs in batches of 50, returning the track for each one or None."""
+    client = client or get_client()
+    tracks = []
+    for i in range(0, len(track_ids), TRACKS_BATCH_SIZE):
+        batch = track_ids[i:i + TRACKS_BATCH_SIZE]
+        tracks.extend(call_api(client.tracks, batch)['tracks'])
+    return tracks
+
+@metrics.timed("import.match")
+def match_tracks(rows, urls=None, client=None, known=None, on_match=None, cache=None, trusted_ids=None):
+    """Resolve each (title, artist) row to a match record, in row order.
+
+    Rows already in known (row index -> match) are reused as they are. Rows whose URL
+    holds a track ID are validated in bulk through the tracks endpoint, unless the ID is
+    in trusted_ids; only the rest are searched for by title and artist. Repeated track
+    IDs and repeated (title, artist) pairs are looked up once and shared by every row
+    they appear in. A cache that is passed in is left open.
+    """
+    client = client or get_client()
+    matches = [None] * len(rows)
+    for index, match in (known or {}).items():
+        matches[index] = match
+    if known:
+        print(f"Reusing {len(known)} matches from the previous run")
+    
+    def decide(index, match):
+        matches[index] = match
+        if on_match:
+            on_match(index, match)
+    
+    parsed_ids = [parse_track_id(url) for url in (urls if urls is not None else [None] * len(rows))]
+    for index, track_id in enumerate(parsed_ids):
+        if track_id and not matches[index] and track_id in (trusted_ids or ()):
+            decide(index, describe_match(track_id, "synced"))
+    direct = [(index, track_id) for index, track_id in enumerate(parsed_ids) if track_id and not matches[index]]
+    if direct:
+        unique_ids = list(dict.fromkeys(track_id for _, track_id in direct))
+        print(f"Validating {len(unique_ids)} track IDs from the URL column ...")
+        tracks = dict(zip(unique_ids, validate_track_ids(unique_ids, client=client)))
+        for index, track_id in direct:
+            track = tracks[track_id]
+            if track:
+                decide(index, describe_match(track['id'], "url", track, score_candidate(*rows[index], track)))
+    
+    to_search = [index for index, match in enumerate(matches) if not match]
+    if not to_search:
+        return matches
+    
+    groups = {}
+    for index in to_search:
+        groups.setdefault(normalize_key(*rows[index]), []).append(index)
+    groups = list(groups.values())
+    duplicates = len(to_search) - len(groups)
+    if duplicates:
+        metrics.count("import.duplicate_rows", duplicates)
+        print(f"Found {duplicates} repeated tracks, each will only be searched for once")
     
-    new_playlist = sp.user_playlist_create(user=user_id, name=playlist_name, description=desc)
-    playlist_id = new_playlist['id']
+    def decide_group(position, match):
+        if on_match:
+            for index in groups[position]:
+                on_match(index, match)
+    
+    print(f"Searching for {len(groups)} tracks using {search_workers} workers ...")
+    own_cache = cache is None
+    if own_cache:
+        cache = open_search_cache()
+    try:
+        searched = search_tracks(
+            [rows[group[0]] for group in groups],
+            client=client,
+            cache=cache,
+            on_match=decide_group
+        )
+    finally:
+        if cache and own_cache:
+            close_search_cache(cache)
+    
+    for group, match in zip(groups, searched):
+        for index in group:
+            matches[index] = match
+    return matches
+
+def save_csv(records, filename):
+    """Write a list of dicts to a CSV file with a header row."""
+    with open(filename, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(records[0]) if records else [])
+        writer.writeheader()
+        writer.writerows(records)
+
+def save_match_report(rows, matches, playlist_name):
+    """Write the per-row match scores and timings to a CSV next to the unmatched log."""
+    report_filename = f"{playlist_name.replace(' ', '_')}_match_report.csv"
+    save_csv([{
+        "Title": title,
+        "Artist(s)": artist,
+        "Track ID": match["id"] or '',
+        "Matched Title": match["matched_title"],
+        "Matched Artist(s)": match["matched_artists"],
+        "Score": round(match["score"], 3) if match["score"] is not None else '',
+        "Method": match["method"],
+        "Seconds": round(match["seconds"], 3)
+    } for (title, artist), match in zip(rows, matches)], report_filename)
+    print(f"Saved match scores to {report_filename}")
+
+def fetch_playlist_track_ids(playlist_id, client=None):
+    """Read the IDs of the tracks currently in a playlist, in order."""
+    client = client or get_client()
     track_ids = []
-    unmatched_tracks = []
+    while True:
+        page = call_api(client.playlist_items, playlist_id, fields='items(track(id)),total',
+                        limit=100, offset=len(track_ids))
+        track_ids.extend((item.get('track') or {}).get('id') for item in page['items'])
+        if not page['items'] or len(track_ids) >= page['total']:
+            return track_ids
+
+def sync_playlist(playlist_id, entry, track_ids, client=None):
+    """Update an existing playlist to track_ids, sending only the changes since the last import.
+
+    The stored track list is trusted while the playlist's snapshot is unchanged,
+    otherwise the playlist is read back first. If the changes would take more requests
+    than rewriting the playlist, it is rewritten instead. Returns the new snapshot ID.
+    """
+    client = client or get_client()
+    snapshot_id = call_api(client.playlist, playlist_id, fields='snapshot_id')['snapshot_id']
+    old_ids = entry['track_ids']
+    if snapshot_id != entry.get('snapshot_id'):
+        print("Playlist was changed since it was last synced, reading its current tracks ...")
+        old_ids = fetch_playlist_track_ids(playlist_id, client)
     
-    for _, row in df.iterrows():
-        query = f"track:{row['Title']} artist:{row['Artist(s)']}"
-        results = sp.search(q=query, type='track', limit=1)
-        tracks = results['tracks']['items']
+    # Items without an ID (local files, removed tracks) cannot be diffed, so those playlists are rewritten
+    operations = plan_sync(old_ids, track_ids) if None not in old_ids else None
+    rewrite_requests = max(1, math.ceil(len(track_ids) / SYNC_BATCH_SIZE))
+    with metrics.span("import.playlist_sync"):
+        if operations is None or len(operations) > rewrite_requests:
+            print(f"Rewriting the playlist with {rewrite_requests} request(s) ...")
+            result = call_api(client.playlist_replace_items, playlist_id, track_ids[:SYNC_BATCH_SIZE])
+            for i in range(SYNC_BATCH_SIZE, len(track_ids), SYNC_BATCH_SIZE):
+                result = call_api(client.playlist_add_items, playlist_id, track_ids[i:i + SYNC_BATCH_SIZE])
+            metrics.count("sync.rewrite")
+            return result['snapshot_id']
         
-        if tracks:
-            track_ids.append(tracks[0]['id'])
+        changes = {"remove": 0, "reorder": 0, "add": 0}
+        for operation in operations:
+            if operation[0] == "remove":
+                result = call_api(client.playlist_remove_all_occurrences_of_items, playlist_id, operation[1],
+                                  snapshot_id=snapshot_id)
+                changes["remove"] += len(operation[1])
+            elif operation[0] == "reorder":
+                _, start, length, insert_before = operation
+                result = call_api(client.playlist_reorder_items, playlist_id, range_start=start,
+                                  insert_before=insert_before, range_length=length, snapshot_id=snapshot_id)
+                changes["reorder"] += length
+            else:
+                result = call_api(client.playlist_add_items, playlist_id, operation[1], position=operation[2])
+                changes["add"] += len(operation[1])
+            snapshot_id = result['snapshot_id']
+            metrics.count(f"sync.{operation[0]}")
+    
+    print(f"Synced with {len(operations)} request(s): removed {changes['remove']}, "
+          f"moved {changes['reorder']} and added {changes['add']} tracks")
+    return snapshot_id
+
+def create_playlist(client, playlist_name):
+    """Create an empty playlist on the user's account, returning its ID."""
+    desc = base64.b64decode('UGxheWxpc3QgY3JlYXRlZCB1c2luZyB0aGUgU3BvdGlmeSBwbGF5bGlzdCBpbXBvcnRlciBmb3VuZCBhdCBodHRwczovL2dpdGh1Yi5jb20vR3JpZmYtS3lhbC9TcG90aWZ5X1BsYXlsaXN0LUV4dHJhY3Rvcg==').decode('utf-8')
+    user_id = call_api(client.me)['id']
+    return call_api(client.user_playlist_create, user=user_id, name=playlist_name, description=desc)['id']
+
+def collect_matches(rows, matches, track_ids, unmatched_tracks):
+    """Append each matched track ID to track_ids and each row without a match to unmatched_tracks."""
+    for (title, artist), match in zip(rows, matches):
+        if match["id"]:
+            track_ids.append(match["id"])
         else:
-            print(f"Could not find: {row['Title']} by {row['Artist(s)']}")
+            print(f"Could not find: {title} by {artist}")
             unmatched_tracks.append({
-                "Title": row['Title'], 
-                "Artist(s)": row['Artist(s)']
+                "Title": title, 
+                "Artist(s)": artist
             })
-    
+
+def save_unmatched(unmatched_tracks, playlist_name):
     if unmatched_tracks:
         log_filename = f"{playlist_name.replace(' ', '_')}_unmatched.csv"
-        pd.DataFrame(unmatched_tracks).to_csv(log_filename, index=False)
+        save_csv(unmatched_tracks, log_filename)
         print(f"Saved {len(unmatched_tracks)} unmatched tracks to {log_filename}")
-    
-    match_ratio = len(track_ids) / total_tracks if total_tracks > 0 else 0
+
+def check_match_ratio(client, playlist_id, matched, total_tracks, min_match_ratio, keep_playlist=False):
+    """Raise when too few tracks were matched, deleting the playlist unless it existed before this import."""
+    metrics.count("import.matched", matched)
+    match_ratio = matched / total_tracks if total_tracks > 0 else 0
     if match_ratio < min_match_ratio:
-        sp.current_user_unfollow_playlist(playlist_id)
+        if not keep_playlist:
+            call_api(client.current_user_unfollow_playlist, playlist_id)
         raise Exception(
-            f"Only matched {len(track_ids)}/{total_tracks} tracks "
+            f"Only matched {matched}/{total_tracks} tracks "
             f"({match_ratio:.0%}), below threshold {min_match_ratio:.0%}. "
-            f"Playlist has been deleted."
+            f"{'Playlist has been left unchanged.' if keep_playlist else 'Playlist has been deleted.'}"
         )
+
+def remember_playlist(client, playlist_name, playlist_id, track_ids, snapshot_id=None):
+    """Store the playlist's tracks for the next sync to diff against, reading its snapshot when not known."""
+    if snapshot_id is None:
+        snapshot_id = call_api(client.playlist, playlist_id, fields='snapshot_id')['snapshot_id']
+    save_sync_entry(sync_state_path, playlist_name, playlist_id, snapshot_id, track_ids)
+
+def create_playlist_from_csv(csv_file, playlist_name, min_match_ratio=toggle_match_ratio, client=None, cache=None):
+    """Create a Spotify playlist from a scraped playlist file (CSV, Parquet or Arrow).
+
+    A search cache that is passed in (shared by concurrent imports) is left open,
+    otherwise the one configured in config.py is opened for this import.
+
+    Progress is journaled as it happens, so rerunning after a crash or rate limit reuses
+    the same playlist, skips rows already matched and tracks already added. With
+    playlist_sync on, a playlist imported under the same name before is updated in
+    place with only the tracks that changed.
+    """
+    client = client or get_client()
+    # Only the columns the import needs are kept, so the whole file is never held in memory
+    rows = []
+    urls = []
+    for record in read_tracks(csv_file):
+        rows.append((record['Title'], record['Artist(s)']))
+        urls.append(record.get('URL'))
+    total_tracks = len(rows)
+    journal = ImportJournal.open(import_journal_dir, csv_file, playlist_name)
+    # An unfinished import is completed first, the stored entry is only replaced once it has
+    sync_entry = load_sync_entry(sync_state_path, playlist_name) if playlist_sync and not journal.playlist_id else None
+    snapshot_id = None
     
-    batch_size = 100
-    for i in range(0, len(track_ids), batch_size):
-        batch = track_ids[i:i + batch_size]
-        sp.playlist_add_items(playlist_id, batch)
+    try:
+        if journal.playlist_id:
+            playlist_id = journal.playlist_id
+            print(f"Resuming unfinished import into playlist {playlist_id} ...")
+        elif sync_entry:
+            playlist_id = sync_entry['playlist_id']
+            print(f"Syncing changes into existing playlist {playlist_id} ...")
+        else:
+            playlist_id = create_playlist(client, playlist_name)
+            journal.record_playlist(playlist_id)
+        track_ids = []
+        unmatched_tracks = []
+        metrics.count("import.rows", total_tracks)
+        
+        matches = match_tracks(rows, urls, client=client, known=journal.matches, on_match=journal.record_match,
+                               cache=cache, trusted_ids=set(sync_entry['track_ids']) if sync_entry else None)
+        if export_match_report:
+            save_match_report(rows, matches, playlist_name)
+        collect_matches(rows, matches, track_ids, unmatched_tracks)
+        save_unmatched(unmatched_tracks, playlist_name)
+        
+        try:
+            check_match_ratio(client, playlist_id, len(track_ids), total_tracks, min_match_ratio,
+                              keep_playlist=bool(sync_entry))
+        except Exception:
+            journal.finish()
+            raise
+        
+        if sync_entry:
+            snapshot_id = sync_playlist(playlist_id, sync_entry, track_ids, client)
+            remember_playlist(client, playlist_name, playlist_id, track_ids, snapshot_id)
+            journal.finish()
+            print(f"Synced playlist '{playlist_name}' with {len(track_ids)}/{total_tracks} tracks")
+            return playlist_id
+        
+        already_added = journal.added
+        if journal.resumed:
+            # A batch may have been added just before the previous run stopped, without being journaled
+            remote_total = call_api(client.playlist_items, playlist_id, fields='total', limit=1)['total']
+            already_added = min(len(track_ids), max(already_added, remote_total))
+            if already_added:
+                print(f"Skipping {already_added} tracks already added to the playlist")
+        
+        batch_size = 100
+        with metrics.span("import.playlist_add"):
+            for i in range(already_added, len(track_ids), batch_size):
+                batch = track_ids[i:i + batch_size]
+                snapshot_id = call_api(client.playlist_add_items, playlist_id, batch)['snapshot_id']
+                journal.record_added(i + len(batch))
+        if playlist_sync:
+            # Every matched track is in the playlist now, so it is what the next sync diffs against
+            remember_playlist(client, playlist_name, playlist_id, track_ids, snapshot_id)
+        journal.finish()
+    finally:
+        journal.close()
     
     print(f"Created playlist '{playlist_name}' with {len(track_ids)}/{total_tracks} tracks")
+    report_throughput(throttle_for(client).stats())
+    return playlist_id
+
+def import_track_stream(batches, playlist_name, min_match_ratio=toggle_match_ratio, client=None, cache=None):
+    """Create a playlist from batches of track records while they are still being scraped.
+
+    batches is any iterable of lists of scraped records (Title, Artist(s), URL). Each
+    batch is matched as soon as it arrives and tracks are added to the playlist in
+    arrival order, 100 at a time. A search cache that is passed in is left open,
+    otherwise the one configured in config.py is opened for this import.
+
+    With playlist_sync on, a playlist imported under the same name before is updated
+    once every batch is matched, with only the tracks that changed. Streamed imports are
+    not journaled, since their input is not known in full until the end.
+    """
+    client = client or get_client()
+    sync_entry = load_sync_entry(sync_state_path, playlist_name) if playlist_sync else None
+    if sync_entry:
+        playlist_id = sync_entry['playlist_id']
+        print(f"Syncing changes into existing playlist {playlist_id} once every track is matched ...")
+    else:
+        playlist_id = create_playlist(client, playlist_name)
+    trusted_ids = set(sync_entry['track_ids']) if sync_entry else None
+    
+    total_tracks = 0
+    added = 0
+    snapshot_id = None
+    track_ids = []
+    unmatched_tracks = []
+    batch_size = 100
+    own_cache = cache is None
+    if own_cache:
+        cache = open_search_cache()
+    try:
+        for batch in batches:
+            rows = [(record['Title'], record['Artist(s)']) for record in batch]
+            urls = [record.get('URL') for record in batch]
+            total_tracks += len(rows)
+            metrics.count("import.rows", len(rows))
+            collect_matches(rows, match_tracks(rows, urls, client=client, cache=cache, trusted_ids=trusted_ids),
+                            track_ids, unmatched_tracks)
+            
+            # A synced playlist is diffed against the whole track list at the end instead
+            while not sync_entry and len(track_ids) - added >= batch_size:
+                with metrics.span("import.playlist_add"):
+                    snapshot_id = call_api(client.playlist_add_items, playlist_id,
+                                           track_ids[added:added + batch_size])['snapshot_id']
+                added += batch_size
+                print(f"Added {added} tracks to '{playlist_name}' so far")
+        
+        if not sync_entry and added < len(track_ids):
+            with metrics.span("import.playlist_add"):
+                snapshot_id = call_api(client.playlist_add_items, playlist_id, track_ids[added:])['snapshot_id']
+            added = len(track_ids)
+    finally:
+        if cache and own_cache:
+            close_search_cache(cache)
+    
+    save_unmatched(unmatched_tracks, playlist_name)
+    check_match_ratio(client, playlist_id, len(track_ids), total_tracks, min_match_ratio, keep_playlist=bool(sync_entry))
+    
+    if sync_entry:
+        snapshot_id = sync_playlist(playlist_id, sync_entry, track_ids, client)
+        remember_playlist(client, playlist_name, playlist_id, track_ids, snapshot_id)
+        print(f"Synced playlist '{playlist_name}' with {len(track_ids)}/{total_tracks} tracks")
+    else:
+        if playlist_sync:
+            remember_playlist(client, playlist_name, playlist_id, track_ids, snapshot_id)
+        print(f"Created playlist '{playlist_name}' with {len(track_ids)}/{total_tracks} tracks")
+    report_throughput(throttle_for(client).stats())
     return playlist_id
 
 if __name__ == "__main__":
-    create_playlist_from_csv('spotify_playlist.csv', playlist_name)
\ No newline at end of file
+    create_playlist_from_csv(output_file(), playlist_name)
\ No newline at end of file
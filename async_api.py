@@ -0,0 +1,248 @@
+"""Asyncio interface to the extractor and importer, for running many jobs in one event loop.
+
+    async with PlaylistExtractor() as extractor:
+        playlists = await asyncio.gather(*(extractor.extract(url) for url in urls))
+    playlist_id = await import_tracks(playlists[0], "My playlist", client=build_client(auth=token))
+
+All state can be passed in explicitly: scraping settings come from ExtractOptions, the
+browser and consent state belong to the extractor, and each import takes its own Spotify
+client (with its own throttle, see API_importer.build_client) and search cache. Anything
+left out falls back to the config.py defaults, the shared API throttle and the configured
+search cache.
+"""
+from urllib.parse import urljoin
+import asyncio
+
+from metrics import metrics
+from track_writer import PositionBuffer
+from config import (
+    extraction_mode,
+    lean_browser,
+    scrape_segments,
+    max_attempts,
+    gap_refetch_passes,
+    run_headless,
+    fetch_concurrency,
+    fetch_rate_limit,
+    fetch_retries,
+    toggle_match_ratio
+)
+from spotify_scraper import (
+    COOKIE_ACCEPT_SELECTORS,
+    CONSENT_COOKIE,
+    CONSENT_TIMEOUT,
+    SCROLLABLE_ELEMENTS_SCRIPT,
+    NO_ANIMATIONS_SCRIPT,
+    BROWSER_USER_AGENT,
+    LEAN_BROWSER_ARGS,
+    LEAN_VIEWPORT,
+    TrackStore,
+    track_records,
+    pick_scroll_container,
+    segment_bounds,
+    scroll_harvest,
+    harvest_segment,
+    refetch_gaps_async,
+    fetch_all_track_data,
+    block_heavy_resources_async,
+    is_playlist_content_request,
+    parse_playlist_items
+)
+
+# Extraction modes the async extractor supports, the same ones as extraction_mode in config.py
+EXTRACTION_MODES = ("dom", "network", "http")
+
+class ExtractOptions:
+    """Settings for one extraction. on_track is called with each track record in playlist order as it is harvested."""
+    def __init__(self, mode=extraction_mode, lean=lean_browser, segments=scrape_segments, attempts=max_attempts,
+                 gap_passes=gap_refetch_passes, fetch_concurrency=fetch_concurrency, fetch_rate_limit=fetch_rate_limit,
+                 fetch_retries=fetch_retries, on_track=None):
+        if mode not in EXTRACTION_MODES:
+            raise ValueError(f"Unknown extraction mode {mode!r}, expected one of: {', '.join(EXTRACTION_MODES)}")
+        self.mode = mode
+        self.lean = lean
+        self.segments = segments
+        self.attempts = attempts
+        self.gap_passes = gap_passes
+        self.fetch_concurrency = fetch_concurrency
+        self.fetch_rate_limit = fetch_rate_limit
+        self.fetch_retries = fetch_retries
+        self.on_track = on_track
+
+async def accept_cookie_banner(page, timeout=CONSENT_TIMEOUT):
+    """Accept the cookie banner if it shows up, returning whether consent is now given."""
+    from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+    if any(cookie["name"] == CONSENT_COOKIE for cookie in await page.context.cookies()):
+        return True
+    accept_button = page.locator(", ".join(COOKIE_ACCEPT_SELECTORS)).first
+    try:
+        await accept_button.wait_for(state="visible", timeout=timeout)
+    except PlaywrightTimeoutError:
+        return False
+    await accept_button.click(timeout=5000)
+    try:
+        await accept_button.wait_for(state="hidden", timeout=5000)
+    except PlaywrightTimeoutError:
+        pass
+    return True
+
+async def read_song_count(page):
+    """The playlist's total from its music:song_count meta tag, or 0 when it is missing."""
+    song_count = page.locator('meta[name="music:song_count"]')
+    if await song_count.count() == 0:
+        return 0
+    return int(await song_count.get_attribute("content") or 0)
+
+class PlaylistExtractor:
+    """One browser shared by any number of concurrent extractions, each in its own context.
+
+    The storage state is captured the first time a cookie banner is accepted and given
+    to every later context, so the banner is only dealt with once per extractor. It is
+    also saved to state_path, when given, for later runs to start with.
+    """
+    def __init__(self, headless=run_headless, options=None, storage_state=None, state_path=None):
+        self.headless = headless
+        self.options = options or ExtractOptions()
+        self.storage_state = storage_state
+        self.state_path = state_path
+        self.playwright = None
+        self.browser = None
+
+    async def start(self):
+        from playwright.async_api import async_playwright
+        self.playwright = await async_playwright().start()
+        self.browser = await self.playwright.chromium.launch(
+            headless=self.headless,
+            args=LEAN_BROWSER_ARGS if self.options.lean else []
+        )
+        return self
+
+    async def close(self):
+        if self.browser:
+            await self.browser.close()
+        if self.playwright:
+            await self.playwright.stop()
+        self.browser = self.playwright = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def extract(self, url, options=None):
+        """Scrape one playlist and return its track records in playlist order."""
+        options = options or self.options
+        if options.mode == "http":
+            track_data = await extract_over_http(url, options)
+            if track_data is not None:
+                return track_data
+            print(f"{url} needs JavaScript to list every track, falling back to the browser ...")
+        context = await self.browser.new_context(
+            viewport=LEAN_VIEWPORT if options.lean else {'width': 1920, 'height': 1080},
+            user_agent=BROWSER_USER_AGENT,
+            storage_state=self.storage_state,
+            reduced_motion="reduce" if options.lean else None
+        )
+        try:
+            with metrics.span("async.extract"):
+                return await self.extract_in_context(context, url, options)
+        finally:
+            await context.close()
+
+    async def extract_in_context(self, context, url, options):
+        in_order = PositionBuffer(options.on_track) if options.on_track else None
+        emit_row = (lambda row: in_order.put(track_records([row])[0], row.get("index"))) if in_order else None
+        store = TrackStore(on_track=emit_row, on_skip=in_order.skip if in_order else None)
+        if options.lean or options.mode == "network":
+            await context.route("**/*", block_heavy_resources_async)
+        if options.lean:
+            await context.add_init_script(NO_ANIMATIONS_SCRIPT)
+        page = await context.new_page()
+
+        if options.mode == "network":
+            async def on_response(response):
+                try:
+                    if is_playlist_content_request(response.url, response.request.post_data):
+                        store.add(parse_playlist_items(await response.json()))
+                except Exception as e:
+                    print(f"Could not read playlist response: {e}")
+            page.on("response", on_response)
+
+        await page.goto(url, timeout=30000)
+        if await accept_cookie_banner(page) and self.storage_state is None:
+            self.storage_state = await context.storage_state(path=self.state_path or None)
+        try:
+            await page.wait_for_selector('[data-testid="playlist-tracklist"], [data-testid="entityTitle"]', timeout=15000)
+        except Exception:
+            print(f"Warning: Playlist elements not fully loaded for {url}, attempting to continue ...")
+
+        song_total = await read_song_count(page)
+        selector = pick_scroll_container(await page.evaluate(SCROLLABLE_ELEMENTS_SCRIPT))
+        bounds = segment_bounds(song_total, options.segments)
+        rendered_store = TrackStore()
+        if options.mode == "network":
+            # Rendering the rows makes the page request every playlist page. They are kept for
+            # positions whose response is never captured, the page hands each row over only once
+            await scroll_harvest(page, selector, rendered_store, song_total, options.attempts)
+        if not store and len(bounds) > 1:
+            if in_order:
+                # Segments are harvested side by side, so every one after the first has to wait its turn
+                in_order.lookahead = None
+            await asyncio.gather(*(harvest_segment(context, url, selector, first, last, store, options.attempts)
+                                   for first, last in bounds))
+        elif not store:
+            await scroll_harvest(page, selector, store, song_total, options.attempts)
+        # In network mode responses fill the gaps, rendered rows only cover what they miss
+        await refetch_gaps_async(page, selector, store, song_total, options.gap_passes, options.attempts,
+                                 dom_store=rendered_store if options.mode == "network" else None)
+
+        if in_order:
+            in_order.flush()
+        if store:
+            track_data = track_records(store.ordered())
+        else:
+            songs = page.locator('meta[name="music:song"]')
+            track_urls = [urljoin(url, await songs.nth(i).get_attribute("content")) for i in range(await songs.count())]
+            track_data = await fetch_all_track_data(
+                track_urls,
+                concurrency=options.fetch_concurrency,
+                rate_limit=options.fetch_rate_limit,
+                retries=options.fetch_retries,
+                browser=self.browser,
+                storage_state=self.storage_state,
+                lean=options.lean
+            )
+            if options.on_track:
+                for record in track_data:
+                    options.on_track(record)
+
+        if song_total and song_total != len(track_data):
+            print(f"Validation failed for {url}, difference of {song_total - len(track_data)} songs")
+        return track_data
+
+async def extract_over_http(url, options):
+    """Scrape a playlist from its page HTML without a browser, or return None when that is not enough.
+
+    The pages are fetched with the requests session and worker pool of http_scraper, in a
+    worker thread, so on_track is called from that thread.
+    """
+    from http_scraper import scrape_playlist_http
+    with metrics.span("async.extract_http"):
+        return await asyncio.to_thread(scrape_playlist_http, url, options.on_track,
+                                       options.fetch_concurrency, options.fetch_rate_limit)
+
+async def extract_playlist(url, options=None, headless=run_headless):
+    """Scrape a single playlist with a browser of its own. Use PlaylistExtractor for many."""
+    async with PlaylistExtractor(headless=headless, options=options) as extractor:
+        return await extractor.extract(url)
+
+async def import_tracks(records, playlist_name, client, min_match_ratio=toggle_match_ratio, cache=None):
+    """Create a playlist from track records without blocking the event loop, returning its ID.
+
+    spotipy is synchronous, so the import runs in a worker thread. Calls go through the
+    throttle the client was built with, or the shared API throttle when it has none. A
+    search cache that is passed in is left open for other jobs.
+    """
+    from API_importer import import_track_stream
+    return await asyncio.to_thread(import_track_stream, [list(records)], playlist_name, min_match_ratio, client, cache)
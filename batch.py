@@ -0,0 +1,106 @@
+"""Mirror many shared playlists in one run from a manifest of playlist URLs and names.
+
+The manifest is either a CSV file with url and name columns, or a JSON list of
+{"url": ..., "name": ...} objects.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import json
+import time
+import csv
+import os
+from config import (
+    run_headless,
+    batch_manifest,
+    batch_workers,
+    batch_output_dir,
+    consent_state_path
+)
+from spotify_scraper import save_tracks, consent_storage_state
+from async_api import PlaylistExtractor
+from API_importer import create_playlist_from_csv, open_search_cache, close_search_cache
+from track_writer import output_file
+
+def read_manifest(path):
+    """Read (url, name) pairs from a CSV or JSON manifest."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".json"):
+            entries = json.load(f)
+        else:
+            entries = list(csv.DictReader(f))
+    return [(entry["url"].strip(), entry["name"].strip()) for entry in entries if entry.get("url")]
+
+def run_batch(manifest_path=batch_manifest, headless=run_headless, workers=batch_workers, output_dir=batch_output_dir):
+    """Scrape and import every playlist in the manifest, returning a summary per playlist.
+
+    Playlists are scraped on one browser, up to workers at a time, each in a context of
+    its own that starts with the cookie consent captured by the first. Imports run in a
+    separate pool as soon as each playlist is scraped, all sharing the one API client
+    and its rate limit, and one search cache.
+    """
+    entries = read_manifest(manifest_path)
+    os.makedirs(output_dir, exist_ok=True)
+    print(f"Processing {len(entries)} playlists with {workers} workers ...")
+    
+    summary = {name: {"Name": name, "URL": url, "Tracks": 0, "Playlist ID": "", "Status": "pending", "Seconds": 0.0}
+               for url, name in entries}
+    cache = open_search_cache()
+    
+    def import_playlist(csv_path, name, started):
+        try:
+            summary[name]["Playlist ID"] = create_playlist_from_csv(csv_path, name, cache=cache)
+            summary[name]["Status"] = "imported"
+        except Exception as e:
+            summary[name]["Status"] = f"import failed: {e}"
+        summary[name]["Seconds"] = round(time.monotonic() - started, 1)
+    
+    async def scrape_all(import_pool):
+        slots = asyncio.Semaphore(max(1, workers))
+        async with PlaylistExtractor(headless=headless, storage_state=consent_storage_state(),
+                                     state_path=consent_state_path) as extractor:
+            async def scrape(url, name):
+                async with slots:
+                    started = time.monotonic()
+                    safe_name = "".join(char if char.isalnum() else "_" for char in name)
+                    csv_path = output_file(os.path.join(output_dir, safe_name))
+                    try:
+                        track_data = await extractor.extract(url)
+                    except Exception as e:
+                        summary[name]["Status"] = f"scrape failed: {e}"
+                        summary[name]["Seconds"] = round(time.monotonic() - started, 1)
+                        return
+                
+                summary[name]["Tracks"] = len(track_data)
+                if not track_data:
+                    summary[name]["Status"] = "no tracks found"
+                    summary[name]["Seconds"] = round(time.monotonic() - started, 1)
+                    return
+                await asyncio.to_thread(save_tracks, track_data, csv_path, os.path.join(output_dir, f"{safe_name}.json"))
+                summary[name]["Status"] = "importing"
+                import_pool.submit(import_playlist, csv_path, name, started)
+            
+            await asyncio.gather(*(scrape(url, name) for url, name in entries))
+    
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="batch-import") as import_pool:
+            asyncio.run(scrape_all(import_pool))
+    finally:
+        if cache:
+            close_search_cache(cache)
+    
+    rows = list(summary.values())
+    summary_path = os.path.join(output_dir, "batch_summary.csv")
+    with open(summary_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["Name", "URL", "Tracks", "Playlist ID", "Status", "Seconds"])
+        writer.writeheader()
+        writer.writerows(rows)
+    
+    print("\nBatch summary:")
+    for row in rows:
+        print(f"  {row['Name']}: {row['Status']} ({row['Tracks']} tracks, {row['Seconds']}s)")
+    print(f"Saved batch summary to {summary_path}")
+    return rows
+
+if __name__ == "__main__":
+    import sys
+    run_batch(sys.argv[1] if len(sys.argv) > 1 else batch_manifest)
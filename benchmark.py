@@ -0,0 +1,324 @@
+"""Offline benchmark for the scraper and importer.
+
+Serves generated playlist pages (with a virtualized, lazily loaded tracklist like the
+Spotify web player) and a fake Spotify Web API locally, then times scraping and
+importing at several playlist sizes:
+
+    python benchmark.py --sizes 100 1000 10000 --latency 0.02 --rate-limit-every 200
+
+Results are printed as a table and saved to benchmark_results/.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from datetime import datetime
+import argparse
+import tempfile
+import tracemalloc
+import threading
+import json
+import time
+import csv
+import os
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, where peak RSS is reported as 0
+    resource = None
+
+from fake_spotify_api import FakeSpotifyAPI
+from metrics import metrics
+
+ROW_HEIGHT = 56
+PAGE_SIZE = 100
+
+def fixture_track(index):
+    """The generated track at a 1-based playlist position."""
+    track_id = f"{index:022d}"
+    return {
+        "id": track_id,
+        "uri": f"spotify:track:{track_id}",
+        "name": f"Benchmark Song {index}",
+        "artists": [{"name": f"Benchmark Artist {index % 97}"}] + ([{"name": "Guest Artist"}] if index % 5 == 0 else []),
+        "album": f"Benchmark Album {index % 31}",
+        "duration_ms": 120000 + index % 180000
+    }
+
+def fixture_catalog(size):
+    return [fixture_track(index) for index in range(1, size + 1)]
+
+def playlist_page(size):
+    """HTML for a playlist page whose rows are fetched in pages and virtualized on scroll."""
+    song_meta = "\n".join(f'<meta name="music:song" content="/track/{index:022d}">' for index in range(1, size + 1))
+    return f"""<!DOCTYPE html>
+<html><head>
+<title>Benchmark Playlist</title>
+<meta property="og:title" content="Benchmark Playlist {size}">
+<meta name="music:song_count" content="{size}">
+{song_meta}
+<style>
+    body {{ margin: 0; }}
+    #main {{ height: 100vh; overflow-y: auto; }}
+    .row {{ height: {ROW_HEIGHT}px; box-sizing: border-box; }}
+</style>
+</head><body>
+<div id="main" class="main-view-container">
+    <h1 data-testid="entityTitle">Benchmark Playlist {size}</h1>
+    <div data-testid="playlist-tracklist" role="grid" aria-rowcount="{size + 1}">
+        <div role="row" aria-rowindex="1">Title / Artist</div>
+        <div id="spacer" style="position: relative; height: {size * ROW_HEIGHT}px;">
+            <div id="rows" style="position: absolute; left: 0; right: 0;"></div>
+        </div>
+    </div>
+</div>
+<script>
+    const TOTAL = {size}, PAGE = {PAGE_SIZE}, ROW = {ROW_HEIGHT}, OVERSCAN = 5;
+    const main = document.getElementById('main');
+    const rows = document.getElementById('rows');
+    const spacer = document.getElementById('spacer');
+    const loaded = new Map();
+    const requested = new Set();
+
+    function loadPage(offset) {{
+        if (requested.has(offset)) return;
+        requested.add(offset);
+        fetch(`/pathfinder/v1/query?operationName=fetchPlaylistContents&playlist=${{TOTAL}}&offset=${{offset}}&limit=${{PAGE}}`)
+            .then(response => response.json())
+            .then(payload => {{
+                const content = payload.data.playlistV2.content;
+                content.items.forEach((item, position) => loaded.set(content.pagingInfo.offset + position + 1, item.itemV2.data));
+                render();
+            }});
+    }}
+
+    function render() {{
+        const top = main.scrollTop - spacer.offsetTop;
+        const first = Math.max(1, Math.floor(top / ROW) + 1 - OVERSCAN);
+        const last = Math.min(TOTAL, first + Math.ceil(main.clientHeight / ROW) + 2 * OVERSCAN);
+        for (let offset = Math.floor((first - 1) / PAGE) * PAGE; offset < last; offset += PAGE) loadPage(offset);
+
+        const html = [];
+        for (let index = first; index <= last && loaded.has(index); index++) {{
+            const track = loaded.get(index);
+            const artists = track.artists.items
+                .map((artist, i) => `<a href="/artist/${{index}}-${{i}}">${{artist.profile.name}}</a>`).join(', ');
+            html.push(`<div role="row" class="row" aria-rowindex="${{index + 1}}"><div data-testid="tracklist-row">` +
+                `<a data-testid="internal-track-link" href="/track/${{track.uri.split(':')[2]}}">${{track.name}}</a> ` +
+                `${{artists}}</div></div>`);
+        }}
+        rows.style.top = ((first - 1) * ROW) + 'px';
+        rows.innerHTML = html.join('');
+    }}
+
+    main.addEventListener('scroll', render);
+    render();
+</script>
+</body></html>"""
+
+def track_page(track):
+    artists = ", ".join(artist["name"] for artist in track["artists"])
+    return f"""<!DOCTYPE html>
+<html><head>
+<meta property="og:title" content="{track['name']}">
+<meta name="music:musician_description" content="{artists}">
+</head><body><h1 data-testid="entityTitle">{track['name']}</h1></body></html>"""
+
+def playlist_contents(size, offset, limit):
+    """The JSON the fixture page requests for one page of tracks, in the web player's shape."""
+    items = []
+    for index in range(offset + 1, min(size, offset + limit) + 1):
+        track = fixture_track(index)
+        items.append({"itemV2": {"data": {
+            "__typename": "Track",
+            "name": track["name"],
+            "uri": track["uri"],
+            "artists": {"items": [{"profile": {"name": artist["name"]}} for artist in track["artists"]]},
+            "albumOfTrack": {"name": track["album"]},
+            "trackDuration": {"totalMilliseconds": track["duration_ms"]}
+        }}})
+    return {"data": {"playlistV2": {"content": {
+        "pagingInfo": {"offset": offset, "limit": limit},
+        "totalCount": size,
+        "items": items
+    }}}}
+
+class FixtureServer:
+    """Serve /playlist/<size>, /track/<id> and the playlist contents JSON on localhost."""
+    def __init__(self, page_delay=0.0):
+        self.page_delay = page_delay
+        self.server = None
+
+    def start(self):
+        fixtures = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+                parts = parsed.path.strip("/").split("/")
+                if parts[0] == "playlist" and len(parts) == 2:
+                    self.reply(playlist_page(int(parts[1])), "text/html")
+                elif parts[0] == "track" and len(parts) == 2:
+                    self.reply(track_page(fixture_track(int(parts[1]))), "text/html")
+                elif parts[0] == "pathfinder":
+                    if fixtures.page_delay:
+                        time.sleep(fixtures.page_delay)
+                    body = playlist_contents(int(params.get("playlist", 0)), int(params.get("offset", 0)), int(params.get("limit", PAGE_SIZE)))
+                    self.reply(json.dumps(body), "application/json")
+                else:
+                    self.send_error(404)
+
+            def reply(self, text, content_type):
+                data = text.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def write_fixture_csv(path, size, with_urls=0.5):
+    """Write a scraped-playlist CSV for the import benchmark; with_urls is the share of rows with a URL."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Title", "Artist(s)", "URL"])
+        for track in fixture_catalog(size):
+            index = int(track["id"])
+            url = f"https://open.spotify.com/track/{track['id']}" if (index % 100) < with_urls * 100 else ""
+            writer.writerow([track["name"], ", ".join(artist["name"] for artist in track["artists"]), url])
+
+def child_peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024 if resource else 0.0
+
+def own_peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else 0.0
+
+def measure(label, size, func):
+    """Run one benchmark case, returning its timings, throughput and memory use."""
+    metrics.reset()
+    tracemalloc.start()
+    started = time.perf_counter()
+    error = None
+    tracks = 0
+    try:
+        tracks = func()
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    wall = time.perf_counter() - started
+    _, python_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    summary = metrics.summary()
+    return {
+        "case": label,
+        "size": size,
+        "tracks": tracks,
+        "wall_seconds": round(wall, 3),
+        "tracks_per_second": round(tracks / wall, 1) if wall and tracks else 0.0,
+        "python_peak_mb": round(python_peak / 1024 / 1024, 1),
+        "process_peak_rss_mb": round(own_peak_rss_mb(), 1),
+        "browser_peak_rss_mb": round(child_peak_rss_mb(), 1),
+        "phases": summary["phases"],
+        "counters": summary["counters"],
+        "error": error
+    }
+
+def bench_scrape(base_url, size, mode):
+    if mode == "http":
+        from http_scraper import scrape_playlist_http
+        return measure("scrape:http", size, lambda: len(scrape_playlist_http(f"{base_url}/playlist/{size}") or []))
+
+    from playwright.sync_api import sync_playwright
+    from spotify_scraper import launch_browser, scrape_playlist
+
+    def run():
+        with sync_playwright() as playwright:
+            browser = launch_browser(playwright, headless=True)
+            try:
+                return len(scrape_playlist(browser, f"{base_url}/playlist/{size}", headless=True, mode=mode))
+            finally:
+                browser.close()
+    return measure(f"scrape:{mode}", size, run)
+
+def bench_import(size, latency, rate_limit_every, api_rate):
+    import API_importer
+    from throttle import AdaptiveThrottle
+
+    api = FakeSpotifyAPI(fixture_catalog(size), latency=latency, rate_limit_every=rate_limit_every)
+    api.start()
+    API_importer.api_throttle = AdaptiveThrottle(api_rate, max_concurrency=API_importer.search_workers)
+    workdir = tempfile.mkdtemp(prefix="spotify_benchmark_")
+    previous_dir = os.getcwd()
+    os.chdir(workdir)
+    try:
+        write_fixture_csv("benchmark.csv", size)
+
+        def run():
+            playlist_id = API_importer.create_playlist_from_csv("benchmark.csv", f"Benchmark {size}", client=api.client())
+            return len(api.playlists[playlist_id]["items"])
+        result = measure("import", size, run)
+        result["api_requests"] = dict(api.request_counts)
+        result["api_rate_limited"] = api.rate_limited
+        return result
+    finally:
+        os.chdir(previous_dir)
+        api.stop()
+
+def print_results(results):
+    print(f"\n{'case':<16}{'size':>8}{'tracks':>8}{'wall s':>10}{'tracks/s':>10}{'py MB':>8}{'rss MB':>8}{'browser MB':>12}")
+    for result in results:
+        print(f"{result['case']:<16}{result['size']:>8}{result['tracks']:>8}{result['wall_seconds']:>10}"
+              f"{result['tracks_per_second']:>10}{result['python_peak_mb']:>8}{result['process_peak_rss_mb']:>8}"
+              f"{result['browser_peak_rss_mb']:>12}")
+        if result["error"]:
+            print(f"    error: {result['error']}")
+        for name, phase in sorted(result["phases"].items(), key=lambda item: -item[1]["seconds"])[:6]:
+            print(f"    {name}: {phase['seconds']:.2f}s over {phase['calls']} call(s)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scraper and importer against local fixtures.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000], help="playlist sizes to benchmark")
+    parser.add_argument("--modes", nargs="+", default=["http", "dom", "network"], help="scraper extraction modes to benchmark")
+    parser.add_argument("--skip-scrape", action="store_true", help="only benchmark the importer")
+    parser.add_argument("--skip-import", action="store_true", help="only benchmark the scraper")
+    parser.add_argument("--page-delay", type=float, default=0.05, help="seconds before each playlist contents page is served")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added to every fake API response")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="answer every Nth API request with a 429")
+    parser.add_argument("--api-rate", type=float, default=50, help="API requests per second allowed by the token bucket")
+    parser.add_argument("--output-dir", default="benchmark_results", help="folder for the JSON results")
+    args = parser.parse_args()
+
+    results = []
+    if not args.skip_scrape:
+        fixtures = FixtureServer(page_delay=args.page_delay)
+        base_url = fixtures.start()
+        try:
+            for size in args.sizes:
+                for mode in args.modes:
+                    print(f"Benchmarking scrape ({mode}) of {size} tracks ...")
+                    results.append(bench_scrape(base_url, size, mode))
+        finally:
+            fixtures.stop()
+    if not args.skip_import:
+        for size in args.sizes:
+            print(f"Benchmarking import of {size} tracks ...")
+            results.append(bench_import(size, args.latency, args.rate_limit_every, args.api_rate))
+
+    print_results(results)
+    os.makedirs(args.output_dir, exist_ok=True)
+    path = os.path.join(args.output_dir, f"benchmark_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"arguments": vars(args), "results": results}, f, indent=2)
+    print(f"\nSaved benchmark results to {path}")
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,40 @@ playlist_url = ""
 # Number of attempts to scrape the songs after the page scrolls down and finds no new values (default to 3)
 max_attempts = 3
 
+# Number of passes that jump back to tracks missing after scrolling and fetch just those (0 turns this off, default to 2)
+gap_refetch_passes = 2
+
+# Number of track pages fetched at the same time when falling back to metadata extraction (default to 4)
+fetch_concurrency = 4
+
+# Maximum number of track pages requested per second across all fetch workers (default to 4)
+fetch_rate_limit = 4
+
+# Number of times a failed track page is retried, waiting longer after each failure (default to 3)
+fetch_retries = 3
+
+# Number of browser pages that scrape different parts of a very large playlist at the same time (1 turns this off)
+scrape_segments = 4
+
+# How tracks are read from the playlist page. "dom" reads the rendered tracklist, "network" reads the
+# web player's playlist JSON responses (faster, and also includes album, duration and ISRC when available). "http" reads the
+# page HTML without starting a browser (fastest and lightest), falling back to "dom" when the page needs JavaScript
+extraction_mode = "dom"
+
+# Format the scraped playlist is saved in. "csv" (with a JSON backup), or the compact "parquet" or "arrow",
+# which are smaller and faster to read for very large playlists (both need: pip install pyarrow)
+output_format = "csv"
+
+# Optional path to a recorded .har file to replay the playlist page from instead of the live site (network mode only)
+har_replay_path = ""
+
+# File where the browser state is saved after the cookie banner is accepted, so later runs skip it. Set to "" to accept it every run
+consent_state_path = ".spotify_consent_state.json"
+
+# Setting this to True runs the browser with a lean profile: images, media, fonts and trackers are blocked, the GPU and
+# animations are turned off, and a taller window loads more tracks per scroll step
+lean_browser = True
+
 # Setting this to True will run the web browser in silent mode. Set this to False to see the browser for debugging
 run_headless = True
 
@@ -15,9 +49,68 @@ REDIRECT_URI = 'http://127.0.0.1:8888/callback' #Don't change unless Spotify mak
 # The ratio for songs to be imported from csv to be considered successful. Range from 0.0 to 1.0 (default is 80%) 
 toggle_match_ratio = 0.8
 
+# Number of track searches sent to Spotify at the same time during playlist import (default to 8)
+search_workers = 8
+
+# Number of Spotify API requests per second shared across all search workers to start at (default to 10).
+# The rate is raised while Spotify keeps up and halved whenever it rate limits the importer
+api_rate_limit = 10
+
+# Highest number of Spotify API requests per second the importer speeds up to (default to 30)
+api_rate_limit_max = 30
+
+# Number of failed Spotify API requests in a row that pauses all requests before trying again (default to 10)
+api_breaker_threshold = 10
+
+# Seconds all Spotify API requests are paused for when they keep failing, doubled each time it happens again (default to 30)
+api_breaker_cooldown = 30
+
+# Number of search results compared against each track before picking the best one (default to 5)
+match_candidates = 5
+
+# Minimum similarity score (0.0 to 1.0) of title and artist for a search result to be accepted (default to 0.75)
+min_match_score = 0.75
+
+# Setting this to True saves a CSV with the match score, method and search time for every track
+export_match_report = True
+
+# File used to remember search results between runs. Set to "" to always search Spotify
+search_cache_path = ".spotify_search_cache.sqlite"
+
+# Maximum number of search results kept in the cache before the least recently used are removed (default to 100000)
+search_cache_max_entries = 100000
+
+# Number of days a track that could not be found is remembered before it is searched for again (default to 7)
+search_cache_negative_ttl_days = 7
+
+# Folder where unfinished imports are journaled, so a crashed or interrupted import resumes where it stopped
+import_journal_dir = "import_journals"
+
 # Enter the name you want for the new playlist here
 playlist_name = ""
 
+# Setting this to True updates the playlist imported before under the same name with only the tracks that changed,
+# instead of creating a new playlist every run
+playlist_sync = False
+
+# File where the ID, snapshot and tracks of each synced playlist are kept between runs
+sync_state_path = "playlist_sync.json"
+
+# Folder where timing and API call metrics for each run are saved as JSON lines. Set to "" to only print them
+metrics_dir = "metrics"
+
 # You can toggle which functionality you want to enable. Toggle with True/False
 playlist_extract = True #Scrapes the shared playlist URL into the CSV
-playlist_import = True #Create a new playlist using the data from the CSV
\ No newline at end of file
+playlist_import = True #Create a new playlist using the data from the CSV
+
+# Setting this to True (with both options above enabled) imports tracks while the playlist is still being extracted
+pipeline_mode = False
+
+# Path to a CSV (url,name columns) or JSON manifest of playlists to extract and import in one run. Leave empty for a single playlist
+batch_manifest = ""
+
+# Number of playlists scraped and imported at the same time in batch mode (default to 2)
+batch_workers = 2
+
+# Folder where batch mode writes each playlist's CSV/JSON and the batch summary
+batch_output_dir = "batch_output"
\ No newline at end of file
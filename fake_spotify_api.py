@@ -0,0 +1,279 @@
+"""A small local stand-in for the Spotify Web API endpoints used by API_importer.
+
+Run it directly to serve a catalog generated from a scraped CSV, or start it from
+Python and point a client at it:
+
+    server = FakeSpotifyAPI(catalog_from_csv('spotify_playlist.csv'))
+    server.start()
+    create_playlist_from_csv('spotify_playlist.csv', 'Test', client=server.client())
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import collections
+import itertools
+import threading
+import json
+import time
+import csv
+import re
+
+class FakeSpotifyAPI:
+    """Serve me, search, tracks and playlist endpoints from an in-memory catalog.
+
+    latency adds a fixed delay to every response, and rate_limit_every makes every
+    Nth request fail with a 429 and the given Retry-After header.
+    """
+    def __init__(self, catalog=None, latency=0.0, rate_limit_every=0, retry_after=1, port=0):
+        self.tracks = {track["id"]: track for track in (catalog or [])}
+        self.tracks_by_name = collections.defaultdict(list)
+        for track in self.tracks.values():
+            self.tracks_by_name[track["name"].lower()].append(track)
+        self.playlists = {}
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.port = port
+        self.request_counts = collections.Counter()
+        self.request_total = 0
+        self.rate_limited = 0
+        self.lock = threading.Lock()
+        self.server = None
+        self.playlist_ids = itertools.count(1)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        """Start serving in a background thread and return the base URL."""
+        api = self
+
+        class Handler(FakeSpotifyHandler):
+            pass
+        Handler.api = api
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.url
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def client(self, pool_size=None):
+        """Create a client from API_importer that talks to this server instead of Spotify."""
+        from API_importer import build_client
+        client = build_client(auth="fake-token", **({"pool_size": pool_size} if pool_size else {}))
+        client.prefix = f"{self.url}/v1/"
+        return client
+
+    def should_rate_limit(self, endpoint):
+        with self.lock:
+            self.request_total += 1
+            self.request_counts[endpoint] += 1
+            if self.rate_limit_every and self.request_total % self.rate_limit_every == 0:
+                self.rate_limited += 1
+                return True
+        return False
+
+    def search(self, query, limit):
+        fields = dict(re.findall(r'(track|artist):(.*?)(?=\s+(?:track|artist):|$)', query))
+        title = fields.get("track", "").strip().lower()
+        artist = fields.get("artist", "").strip().lower()
+        words = [] if fields else query.lower().split()
+        matches = []
+        candidates = self.tracks.values()
+        if title and title in self.tracks_by_name:
+            # Exact title hits are answered from the index so large fake catalogs stay fast
+            candidates = self.tracks_by_name[title]
+        for track in candidates:
+            name = track["name"].lower()
+            names = ", ".join(a["name"] for a in track["artists"]).lower()
+            if words:
+                text = f"{name} {names}"
+                found = all(word in text for word in words)
+            else:
+                found = title in name and artist in names
+            if found:
+                matches.append(track)
+                if len(matches) >= limit:
+                    break
+        return matches
+
+    def new_playlist(self, name, description=""):
+        with self.lock:
+            playlist_id = f"fakeplaylist{next(self.playlist_ids)}"
+            self.playlists[playlist_id] = {
+                "id": playlist_id,
+                "name": name,
+                "description": description,
+                "items": [],
+                "snapshot": 1,
+                "followed": True
+            }
+        return self.playlists[playlist_id]
+
+class FakeSpotifyHandler(BaseHTTPRequestHandler):
+    api = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status, body=None, headers=None):
+        data = json.dumps(body).encode("utf-8") if body is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        return json.loads(raw) if raw.strip() else None
+
+    def handle_request(self, method):
+        parsed = urlparse(self.path)
+        path = parsed.path.rstrip("/")
+        params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        parts = path.split("/")[2:] if path.startswith("/v1/") else []
+        endpoint = f"{method} {'/'.join(part if i % 2 == 0 else '{id}' for i, part in enumerate(parts))}"
+
+        if self.api.latency:
+            time.sleep(self.api.latency)
+        if self.api.should_rate_limit(endpoint):
+            return self.reply(429, {"error": {"status": 429, "message": "API rate limit exceeded"}},
+                              {"Retry-After": str(self.api.retry_after)})
+
+        body = self.read_body() if method in ("POST", "PUT", "DELETE") else None
+        handler = getattr(self, f"{method.lower()}_{parts[0] if parts else ''}", None)
+        result = handler(parts[1:], params, body) if handler else None
+        if result is None:
+            return self.reply(404, {"error": {"status": 404, "message": "Not found"}})
+        self.reply(*result) if isinstance(result, tuple) else self.reply(200, result)
+
+    def do_GET(self):
+        self.handle_request("GET")
+
+    def do_POST(self):
+        self.handle_request("POST")
+
+    def do_PUT(self):
+        self.handle_request("PUT")
+
+    def do_DELETE(self):
+        self.handle_request("DELETE")
+
+    def get_me(self, parts, params, body):
+        return {"id": "fake-user", "display_name": "Fake User"}
+
+    def get_search(self, parts, params, body):
+        limit = int(params.get("limit", 10))
+        items = self.api.search(params.get("q", ""), limit)
+        return {"tracks": {"items": items, "total": len(items), "limit": limit, "offset": 0}}
+
+    def get_tracks(self, parts, params, body):
+        ids = [track_id for track_id in params.get("ids", "").split(",") if track_id]
+        if len(ids) > 50:
+            return 400, {"error": {"status": 400, "message": "Too many ids requested"}}
+        return {"tracks": [self.api.tracks.get(track_id) for track_id in ids]}
+
+    def post_users(self, parts, params, body):
+        body = body or {}
+        return 201, self.api.new_playlist(body.get("name", ""), body.get("description", ""))
+
+    def post_me(self, parts, params, body):
+        return self.post_users(parts, params, body)
+
+    def delete_playlists(self, parts, params, body):
+        playlist = self.api.playlists.get(parts[0]) if parts else None
+        if not playlist:
+            return None
+        if parts[1:] == ["followers"]:
+            playlist["followed"] = False
+            return 200, None
+        if parts[1:] in (["items"], ["tracks"]):
+            body = body or {}
+            uris = {item["uri"] for item in body.get("items", body.get("tracks", []))}
+            with self.api.lock:
+                playlist["items"] = [uri for uri in playlist["items"] if uri not in uris]
+                playlist["snapshot"] += 1
+            return {"snapshot_id": str(playlist["snapshot"])}
+
+    def get_playlists(self, parts, params, body):
+        playlist = self.api.playlists.get(parts[0]) if parts else None
+        if not playlist:
+            return None
+        if parts[1:] in (["items"], ["tracks"]):
+            offset = int(params.get("offset", 0))
+            limit = int(params.get("limit", 100))
+            items = [{"track": self.api.tracks.get(uri.split(":")[-1]) or {"id": uri.split(":")[-1], "uri": uri}}
+                     for uri in playlist["items"][offset:offset + limit]]
+            return {"items": items, "total": len(playlist["items"]), "offset": offset, "limit": limit}
+        return {
+            "id": playlist["id"],
+            "name": playlist["name"],
+            "snapshot_id": str(playlist["snapshot"]),
+            "tracks": {"total": len(playlist["items"])}
+        }
+
+    def post_playlists(self, parts, params, body):
+        playlist = self.api.playlists.get(parts[0]) if parts else None
+        if not playlist or parts[1:] not in (["items"], ["tracks"]):
+            return None
+        uris = body if isinstance(body, list) else (body or {}).get("uris", [])
+        if len(uris) > 100:
+            return 400, {"error": {"status": 400, "message": "Too many items"}}
+        with self.api.lock:
+            position = params.get("position")
+            position = len(playlist["items"]) if position in (None, "None") else int(position)
+            playlist["items"][position:position] = uris
+            playlist["snapshot"] += 1
+        return 201, {"snapshot_id": str(playlist["snapshot"])}
+
+    def put_playlists(self, parts, params, body):
+        playlist = self.api.playlists.get(parts[0]) if parts else None
+        if not playlist or parts[1:] not in (["items"], ["tracks"]):
+            return None
+        body = body or {}
+        with self.api.lock:
+            if "uris" in body:
+                playlist["items"] = list(body["uris"])
+            else:
+                start, length = body["range_start"], body.get("range_length", 1)
+                moved = playlist["items"][start:start + length]
+                rest = playlist["items"][:start] + playlist["items"][start + length:]
+                insert_before = body["insert_before"]
+                if insert_before > start:
+                    insert_before -= length
+                playlist["items"] = rest[:insert_before] + moved + rest[insert_before:]
+            playlist["snapshot"] += 1
+        return {"snapshot_id": str(playlist["snapshot"])}
+
+def catalog_from_csv(csv_file):
+    """Build a fake catalog from a scraped playlist CSV, one track per row."""
+    catalog = []
+    with open(csv_file, newline="", encoding="utf-8") as f:
+        for index, row in enumerate(csv.DictReader(f)):
+            match = re.search(r"/track/([A-Za-z0-9]+)", row.get("URL") or "")
+            track_id = match.group(1) if match else f"faketrack{index}"
+            catalog.append({
+                "id": track_id,
+                "uri": f"spotify:track:{track_id}",
+                "name": row["Title"],
+                "artists": [{"name": name.strip()} for name in row["Artist(s)"].split(",")]
+            })
+    return catalog
+
+if __name__ == "__main__":
+    import sys
+    server = FakeSpotifyAPI(catalog_from_csv(sys.argv[1] if len(sys.argv) > 1 else "spotify_playlist.csv"), port=8889)
+    print(f"Fake Spotify API running at {server.start()}/v1/ (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,141 @@
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+import collections
+import requests
+import time
+
+from metrics import metrics
+from throttle import TokenBucket
+from config import (
+    fetch_concurrency,
+    fetch_rate_limit,
+    fetch_retries
+)
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+class MetaTagParser(HTMLParser):
+    """Collect the content of every <meta> tag by name or property, stopping at <body>."""
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.meta = collections.defaultdict(list)
+        self.done = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "meta":
+            attrs = dict(attrs)
+            key = attrs.get("name") or attrs.get("property")
+            if key and attrs.get("content") is not None:
+                self.meta[key].append(attrs["content"])
+        elif tag == "body":
+            # Everything we read is in the server-rendered <head>
+            self.done = True
+
+def parse_meta_tags(html):
+    parser = MetaTagParser()
+    # Feed in chunks so parsing can stop at <body> without reading the whole page
+    for start in range(0, len(html), 16384):
+        parser.feed(html[start:start + 16384])
+        if parser.done:
+            break
+    return parser.meta
+
+def build_session(pool_size=fetch_concurrency):
+    """Create a requests session whose connection pool is shared by every fetch worker."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({"User-Agent": USER_AGENT, "Accept-Language": "en"})
+    return session
+
+def fetch_meta(session, url, bucket=None, retries=fetch_retries):
+    """Fetch a page and return its meta tags, retrying failures with a growing backoff."""
+    for attempt in range(retries + 1):
+        if bucket:
+            bucket.acquire()
+        try:
+            response = session.get(url, timeout=30)
+            if response.status_code == 429:
+                retry_after = int(response.headers.get("Retry-After", 2 ** attempt))
+                if bucket:
+                    bucket.pause(retry_after)
+                raise requests.HTTPError(f"rate limited for {retry_after}s")
+            response.raise_for_status()
+            return parse_meta_tags(response.text)
+        except requests.RequestException as e:
+            if attempt == retries:
+                raise
+            metrics.count("http.retries")
+            backoff = 2 ** attempt
+            print(f"Retrying {url} in {backoff}s ({attempt + 1}/{retries}): {e}")
+            time.sleep(backoff)
+
+def fetch_track(session, url, bucket=None):
+    """Read title and artist of one track page from its meta tags."""
+    meta = fetch_meta(session, url, bucket)
+    title = (meta.get("og:title") or [""])[0].strip()
+    artist = (meta.get("music:musician_description") or [""])[0].strip()
+    if not title or not artist:
+        raise ValueError("missing title or artist")
+    return {
+        "Title": title,
+        "Artist(s)": artist,
+        "URL": url
+    }
+
+@metrics.timed("http.track_pages")
+def fetch_all_tracks(session, track_urls, workers=fetch_concurrency, rate_limit=fetch_rate_limit, on_track=None):
+    """Fetch track pages with a pool of threads sharing one session, keeping playlist order."""
+    bucket = TokenBucket(rate_limit)
+
+    def fetch(url):
+        try:
+            return fetch_track(session, url, bucket)
+        except Exception as e:
+            metrics.count("http.track_page_failures")
+            print(f"Error fetching data for {url}: {e}")
+            return None
+
+    track_data = []
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="http-fetch") as executor:
+        for completed, record in enumerate(executor.map(fetch, track_urls), 1):
+            print(f"Progress: {completed}/{len(track_urls)}")
+            if record:
+                track_data.append(record)
+                if on_track:
+                    on_track(record)
+    return track_data
+
+def scrape_playlist_http(url, on_track=None, workers=fetch_concurrency, rate_limit=fetch_rate_limit):
+    """Scrape a playlist from its server-rendered HTML without a browser.
+
+    Returns None when the HTML does not list every track (large playlists are only
+    completed by the web player's JavaScript), so the caller can fall back to Playwright.
+    """
+    session = build_session(workers)
+    try:
+        print("Loading playlist page over HTTP ...")
+        with metrics.span("http.playlist_page"):
+            meta = fetch_meta(session, url)
+
+        song_total = int((meta.get("music:song_count") or ["0"])[0] or 0)
+        # A song in the playlist more than once has a tag for each position, so keep every one
+        track_urls = [urljoin(url, song) for song in meta.get("music:song", [])]
+        print(f"Found {len(track_urls)} of {song_total or 'an unknown number of'} tracks in the page HTML")
+        if not track_urls or len(track_urls) < song_total:
+            return None
+
+        track_data = fetch_all_tracks(session, track_urls, workers, rate_limit, on_track)
+    finally:
+        session.close()
+
+    metrics.count("scrape.tracks", len(track_data))
+    if not song_total:
+        print(f"Could not get total number of songs. Skipping validation check ...")
+    elif song_total == len(track_data):
+        print("Validation successful - all tracks loaded")
+    else:
+        print(f"Validation failed, difference of {song_total - len(track_data)} songs")
+    return track_data
@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+
+class ImportJournal:
+    """Append-only record of an import's progress, so an interrupted run can resume.
+
+    The journal is a JSON lines file holding the created playlist ID, each row's match
+    as soon as it is decided, and how many tracks have been added to the playlist. It
+    only applies to the exact CSV contents and playlist name it was started with, and
+    is removed once the import finishes.
+    """
+    def __init__(self, path, fingerprint):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.playlist_id = None
+        self.matches = {}
+        self.added = 0
+        self.resumed = False
+        self.file = None
+
+    @classmethod
+    def open(cls, journal_dir, csv_file, playlist_name):
+        """Open the journal for this CSV and playlist, loading any unfinished progress."""
+        digest = hashlib.sha1()
+        with open(csv_file, "rb") as f:
+            # Hash in chunks so a very large input file is never held in memory at once
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        digest.update(playlist_name.encode("utf-8"))
+        fingerprint = digest.hexdigest()
+
+        os.makedirs(journal_dir, exist_ok=True)
+        safe_name = "".join(char if char.isalnum() else "_" for char in playlist_name) or "playlist"
+        journal = cls(os.path.join(journal_dir, f"{safe_name}.jsonl"), fingerprint)
+        journal.load()
+        journal.file = open(journal.path, "a", encoding="utf-8")
+        if not journal.resumed:
+            journal.write({"event": "start", "fingerprint": fingerprint, "csv": csv_file})
+        return journal
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            entries = []
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # The last line may be cut short if the previous run was killed mid-write
+                    break
+
+        if not entries or entries[0].get("fingerprint") != self.fingerprint:
+            os.remove(self.path)
+            return
+
+        for entry in entries:
+            if entry["event"] == "playlist":
+                self.playlist_id = entry["playlist_id"]
+            elif entry["event"] == "match":
+                self.matches[entry["index"]] = entry["match"]
+            elif entry["event"] == "added":
+                self.added = max(self.added, entry["count"])
+        self.resumed = True
+
+    def write(self, entry):
+        self.file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def record_playlist(self, playlist_id):
+        self.playlist_id = playlist_id
+        self.write({"event": "playlist", "playlist_id": playlist_id})
+
+    def record_match(self, index, match):
+        self.matches[index] = match
+        self.write({"event": "match", "index": index, "match": match})
+
+    def record_added(self, count):
+        self.added = count
+        self.write({"event": "added", "count": count})
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def finish(self):
+        """Close and remove the journal once the import no longer needs resuming."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
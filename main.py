@@ -1,3 +1,6 @@
+import importlib
+import threading
+import atexit
 import time
 import os
 import sys
@@ -6,10 +9,41 @@ from config import (
     playlist_extract,
     playlist_import,
     run_headless,
-    playlist_name
+    playlist_name,
+    pipeline_mode,
+    batch_manifest,
+    metrics_dir
 )
-from spotify_scraper import main as spotify_scraper
-from API_importer import create_playlist_from_csv as spotify_importer
+from metrics import metrics
+
+# Modules imported by each phase, in the order --profile-startup measures them
+STARTUP_MODULES = ["track_writer", "http_scraper", "spotify_scraper", "playwright.sync_api",
+                   "API_importer", "pipeline", "batch"]
+
+def profile_startup():
+    """Print how long each of the tool's modules takes to import, on top of the ones before it."""
+    print("Import cost of each module (python -X importtime main.py gives a full breakdown):")
+    total = 0.0
+    for name in STARTUP_MODULES:
+        loaded = len(sys.modules)
+        start = time.perf_counter()
+        importlib.import_module(name)
+        seconds = time.perf_counter() - start
+        total += seconds
+        print(f"  {name:<22}{seconds:>8.3f}s{len(sys.modules) - loaded:>6} new modules")
+    print(f"  {'total':<22}{total:>8.3f}s")
+
+def prepare_importer():
+    """Load the importer and start refreshing its token while the playlist is still being extracted."""
+    try:
+        from API_importer import refresh_token_in_background
+        refresh_token_in_background()
+    except Exception as e:
+        print(f"Could not prepare the Spotify client in advance: {e}")
+
+if "--profile-startup" in sys.argv:
+    profile_startup()
+    sys.exit()
 
 class Logger(object):
     def __init__(self, filename=None):
@@ -36,23 +70,47 @@ logger = Logger()
 sys.stdout = logger
 sys.stderr = logger
 
-if playlist_extract:
-    print(f"Playlist extraction selected. Now beginning to export the playlist into a csv file ...")
+def save_metrics():
     print(f"\n")
-    time.sleep(1)
-    spotify_scraper(headless=run_headless)
-else:
-    print(f"Playlist extraction turned off. Continuing to playlist import ...")
-    time.sleep(1)
+    metrics.report()
+    if metrics_dir:
+        print(f"Saved run metrics to {metrics.write(metrics_dir)}")
 
-if playlist_import:
+atexit.register(save_metrics)
+
+if playlist_import or batch_manifest:
+    threading.Thread(target=prepare_importer, name="prepare-importer", daemon=True).start()
+
+if batch_manifest:
+    from batch import run_batch
+    print(f"Batch mode selected. Now extracting and importing every playlist in {batch_manifest} ...")
     print(f"\n")
-    print(f"Playlist import selected. Now importing your playlist to your spotify account ...")
+    run_batch(batch_manifest, headless=run_headless)
+elif playlist_extract and playlist_import and pipeline_mode:
+    from pipeline import run_pipeline
+    print(f"Pipeline mode selected. Importing tracks into your spotify account while the playlist is being extracted ...")
     print(f"\n")
-    time.sleep(1)
-    spotify_importer('spotify_playlist.csv', playlist_name)
-else:
+    run_pipeline(playlist_name, headless=run_headless)
     print(f"\n")
-    print(f"Playlist importer turned off. Finishing running code ...")
+    print(f"Pipeline finished. Finishing running code ...")
     print(f"\n")
-    time.sleep(1)
\ No newline at end of file
+else:
+    if playlist_extract:
+        print(f"Playlist extraction selected. Now beginning to export the playlist into a csv file ...")
+        print(f"\n")
+        from spotify_scraper import main as spotify_scraper
+        spotify_scraper(headless=run_headless)
+    else:
+        print(f"Playlist extraction turned off. Continuing to playlist import ...")
+
+    if playlist_import:
+        print(f"\n")
+        print(f"Playlist import selected. Now importing your playlist to your spotify account ...")
+        print(f"\n")
+        from API_importer import create_playlist_from_csv as spotify_importer
+        from track_writer import output_file
+        spotify_importer(output_file(), playlist_name)
+    else:
+        print(f"\n")
+        print(f"Playlist importer turned off. Finishing running code ...")
+        print(f"\n")
\ No newline at end of file
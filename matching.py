@@ -0,0 +1,83 @@
+from difflib import SequenceMatcher
+from functools import lru_cache
+import unicodedata
+import re
+
+# Version/edition suffixes that Spotify and the scraped playlists often disagree on
+VERSION_PATTERN = re.compile(
+    r'(?:\s*[\(\[]|\s+[\-–]\s+)[^\(\)\[\]]*\b(remaster(ed)?|live|radio edit|single version|album version|'
+    r'mono|stereo|deluxe|bonus track|explicit|clean|edit|version|mix|demo|acoustic)\b[^\(\)\[\]]*[\)\]]?\s*$',
+    re.IGNORECASE
+)
+FEATURING_PATTERN = re.compile(
+    r'\s*[\(\[]\s*(?:feat\.?|ft\.?|featuring|with)\s[^\)\]]*[\)\]]|\s+(?:feat\.|ft\.|featuring)\s.*$',
+    re.IGNORECASE
+)
+ARTIST_SEPARATOR_PATTERN = re.compile(r'\s*(?:,|&|\bfeat\.|\bft\.|\bfeaturing\b)\s*', re.IGNORECASE)
+PUNCTUATION_PATTERN = re.compile(r'[^\w\s]')
+
+def fold(text):
+    """Lowercase text and drop accents and punctuation."""
+    text = ''.join(char for char in unicodedata.normalize('NFKD', str(text)) if not unicodedata.combining(char))
+    return ' '.join(PUNCTUATION_PATTERN.sub(' ', text.casefold()).split())
+
+@lru_cache(maxsize=65536)
+def normalize_title(title):
+    """Normalize a track title, removing featured artists and remaster/live style suffixes."""
+    title = FEATURING_PATTERN.sub('', str(title))
+    previous = None
+    while previous != title:
+        previous = title
+        title = VERSION_PATTERN.sub('', title)
+    return fold(title)
+
+@lru_cache(maxsize=65536)
+def split_artists(artists):
+    """Split a joined artist string into normalized individual artist names."""
+    names = ARTIST_SEPARATOR_PATTERN.split(str(artists))
+    return tuple(name for name in (fold(name) for name in names) if name)
+
+def similarity(a, b):
+    """Return a similarity ratio between 0 and 1 for two normalized strings."""
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    return SequenceMatcher(None, a, b).ratio()
+
+def score_candidate(title, artists, candidate):
+    """Score how well a search result matches a (title, artists) row, from 0 to 1."""
+    wanted_title = normalize_title(title)
+    wanted_artists = split_artists(artists)
+    found_title = normalize_title(candidate.get('name', ''))
+    found_artists = tuple(fold(artist.get('name', '')) for artist in candidate.get('artists', []))
+
+    title_score = similarity(wanted_title, found_title)
+    if not wanted_artists or not found_artists:
+        return title_score
+
+    best_per_artist = [max(similarity(wanted, found) for found in found_artists) for wanted in wanted_artists]
+    artist_score = 0.7 * best_per_artist[0] + 0.3 * (sum(best_per_artist) / len(best_per_artist))
+    # Band names containing separators ("Earth, Wind & Fire") are compared whole as well
+    artist_score = max(artist_score, similarity(' '.join(wanted_artists), ' '.join(found_artists)))
+    return 0.6 * title_score + 0.4 * artist_score
+
+def best_candidate(title, artists, candidates):
+    """Score every candidate for a row in one pass and return (best candidate, score)."""
+    best, best_score = None, 0.0
+    for candidate in candidates:
+        if not candidate:
+            continue
+        score = score_candidate(title, artists, candidate)
+        if score > best_score:
+            best, best_score = candidate, score
+    return best, best_score
+
+def strict_query(title, artists):
+    """Field-filtered search query used for the first pass."""
+    return f"track:{title} artist:{artists}"
+
+def relaxed_query(title, artists):
+    """Plain search query for rows the strict query could not match well."""
+    primary = split_artists(artists)
+    return f"{normalize_title(title)} {primary[0] if primary else ''}".strip()
@@ -0,0 +1,109 @@
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+import collections
+import threading
+import json
+import time
+import os
+
+class Metrics:
+    """Collects phase timings and counters for a run and writes them as JSON lines.
+
+    Each finished span becomes one line in the metrics file, followed by a summary line
+    with the total time per phase and every counter, so runs can be compared over time.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Start a new run, dropping everything collected so far."""
+        self.started = time.time()
+        self.perf_origin = time.perf_counter()
+        self.run_id = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        self.spans = []
+        self.counters = collections.Counter()
+        self.gauges = {}
+
+    @contextmanager
+    def span(self, name, **fields):
+        """Time the enclosed block as one occurrence of the named phase."""
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            record = {
+                "type": "span",
+                "name": name,
+                "start": round(start - self.perf_origin, 6),
+                "seconds": round(time.perf_counter() - start, 6),
+                "thread": threading.current_thread().name,
+                **fields
+            }
+            if error:
+                record["error"] = error
+            with self.lock:
+                self.spans.append(record)
+
+    def timed(self, name):
+        """Decorator that records every call of a function as a span."""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+    def gauge(self, name, value):
+        """Record the latest value of a measurement that goes up and down, such as a rate."""
+        with self.lock:
+            self.gauges[name] = value
+
+    def summary(self):
+        """Total seconds and number of calls per phase, plus all counters."""
+        with self.lock:
+            phases = collections.defaultdict(lambda: {"seconds": 0.0, "calls": 0})
+            for record in self.spans:
+                phases[record["name"]]["seconds"] += record["seconds"]
+                phases[record["name"]]["calls"] += 1
+            return {
+                "type": "summary",
+                "run_id": self.run_id,
+                "wall_seconds": round(time.time() - self.started, 3),
+                "phases": {name: {"seconds": round(phase["seconds"], 3), "calls": phase["calls"]}
+                           for name, phase in phases.items()},
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges)
+            }
+
+    def write(self, directory="metrics"):
+        """Write this run's spans and summary to <directory>/metrics_<run id>.jsonl."""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"metrics_{self.run_id}.jsonl")
+        summary = self.summary()
+        with self.lock, open(path, "w", encoding="utf-8") as f:
+            for record in self.spans:
+                f.write(json.dumps({"run_id": self.run_id, **record}) + "\n")
+            f.write(json.dumps(summary) + "\n")
+        return path
+
+    def report(self):
+        """Print the time spent in each phase, slowest first."""
+        summary = self.summary()
+        print(f"Run took {summary['wall_seconds']:.1f}s")
+        for name, phase in sorted(summary["phases"].items(), key=lambda item: -item[1]["seconds"]):
+            print(f"  {name}: {phase['seconds']:.2f}s over {phase['calls']} call(s)")
+        for name, value in sorted({**summary["counters"], **summary["gauges"]}.items()):
+            print(f"  {name}: {value}")
+
+metrics = Metrics()
@@ -0,0 +1,62 @@
+import threading
+import queue
+import time
+from spotify_scraper import main as spotify_scraper
+from API_importer import import_track_stream
+
+# Most records handed to the importer at once, and how long it waits for a batch to fill (seconds)
+PIPELINE_BATCH_SIZE = 50
+PIPELINE_BATCH_WAIT = 1.0
+
+_DONE = object()
+
+def queued_batches(track_queue, batch_size=PIPELINE_BATCH_SIZE, max_wait=PIPELINE_BATCH_WAIT):
+    """Yield lists of records from the queue, as soon as a batch fills or max_wait passes."""
+    finished = False
+    while not finished:
+        batch = [track_queue.get()]
+        if batch[0] is _DONE:
+            return
+        deadline = time.monotonic() + max_wait
+        while len(batch) < batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                record = track_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if record is _DONE:
+                finished = True
+                break
+            batch.append(record)
+        yield batch
+
+def run_pipeline(playlist_name, headless=True, scrape=spotify_scraper, import_stream=import_track_stream):
+    """Scrape the playlist and import it at the same time.
+
+    The scraper runs in this thread (Playwright's sync API is tied to the thread that
+    started it) and hands each harvested track to an importer thread through a queue.
+    The scraper still writes the playlist output file as the tracks are harvested.
+    """
+    track_queue = queue.Queue()
+    result = {}
+    print("Pipeline mode does not journal the import, an interrupted run starts it over")
+
+    def importer():
+        try:
+            result["playlist_id"] = import_stream(queued_batches(track_queue), playlist_name)
+        except Exception as e:
+            result["error"] = e
+
+    importer_thread = threading.Thread(target=importer, name="playlist-importer", daemon=True)
+    importer_thread.start()
+    try:
+        scrape(headless=headless, on_track=track_queue.put)
+    finally:
+        track_queue.put(_DONE)
+        importer_thread.join()
+
+    if "error" in result:
+        raise result["error"]
+    return result.get("playlist_id")
@@ -0,0 +1,94 @@
+from collections import Counter
+import threading
+import json
+import os
+
+# Maximum number of tracks accepted by a single add, remove or replace request
+SYNC_BATCH_SIZE = 100
+
+state_lock = threading.Lock()
+
+def load_sync_entry(path, playlist_name):
+    """The playlist ID, snapshot and track IDs stored for a playlist by an earlier import."""
+    with state_lock:
+        if not path or not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f).get(playlist_name)
+
+def save_sync_entry(path, playlist_name, playlist_id, snapshot_id, track_ids):
+    """Store what the playlist looks like after an import, for the next sync to diff against."""
+    if not path:
+        return
+    with state_lock:
+        state = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+        state[playlist_name] = {
+            "playlist_id": playlist_id,
+            "snapshot_id": snapshot_id,
+            "track_ids": list(track_ids)
+        }
+        # Write to a temporary file first so a crash never leaves half a state file behind
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
+def plan_sync(old_ids, new_ids):
+    """Work out the playlist requests that turn old_ids into new_ids.
+
+    Returns a list of operations, applied in order:
+      ("remove", ids)                              remove every occurrence of these tracks
+      ("reorder", range_start, range_length, insert_before)
+      ("add", ids, position)                       insert a run of tracks at a position
+
+    Tracks that are no longer wanted (or appear fewer times than before) are removed
+    first, the remaining tracks are moved into the new order a run at a time, and new
+    tracks are inserted where they belong, so a playlist that changed by a few songs
+    needs only a few requests.
+    """
+    operations = []
+    new_counts = Counter(new_ids)
+    old_counts = Counter(old_ids)
+
+    # The remove endpoint drops every occurrence, so tracks with fewer copies are removed and re-added
+    removed = [track_id for track_id in old_counts if old_counts[track_id] > new_counts[track_id]]
+    for i in range(0, len(removed), SYNC_BATCH_SIZE):
+        operations.append(("remove", removed[i:i + SYNC_BATCH_SIZE]))
+    removed = set(removed)
+    current = [track_id for track_id in old_ids if track_id not in removed]
+
+    # The new order of the tracks that stay, then added tracks are the extra occurrences
+    kept_counts = Counter(current)
+    kept = []
+    is_added = []
+    for track_id in new_ids:
+        keep = kept_counts[track_id] > 0
+        if keep:
+            kept_counts[track_id] -= 1
+            kept.append(track_id)
+        is_added.append(not keep)
+
+    for i in range(len(kept)):
+        if current[i] == kept[i]:
+            continue
+        start = current.index(kept[i], i + 1)
+        length = 1
+        while start + length < len(current) and i + length < len(kept) and current[start + length] == kept[i + length]:
+            length += 1
+        operations.append(("reorder", start, length, i))
+        current = current[:i] + current[start:start + length] + current[i:start] + current[start + length:]
+
+    position = 0
+    while position < len(new_ids):
+        if not is_added[position]:
+            position += 1
+            continue
+        end = position
+        while end < len(new_ids) and is_added[end] and end - position < SYNC_BATCH_SIZE:
+            end += 1
+        operations.append(("add", new_ids[position:end], position))
+        position = end
+
+    return operations
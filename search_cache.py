@@ -0,0 +1,90 @@
+import threading
+import sqlite3
+import time
+
+def normalize_key(title, artist):
+    """Build the cache key for a (title, artist) pair, ignoring case and spacing differences."""
+    title = " ".join(str(title).casefold().split())
+    artist = " ".join(str(artist).casefold().split())
+    return f"{title}\x1f{artist}"
+
+class SearchCache:
+    """Persistent cache of search results, mapping normalized (title, artist) to a track ID.
+
+    Tracks that could not be found are stored too, but only trusted for negative_ttl
+    seconds so that songs added to Spotify later get searched for again. The least
+    recently used entries are evicted once the cache grows past max_entries. Share one
+    instance between threads. Separate connections to the same file (other processes)
+    wait for each other's writes instead of failing.
+    """
+    def __init__(self, path, max_entries=100000, negative_ttl=7 * 24 * 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        # Every write commits on its own, so no transaction is left open to lock other connections out.
+        # WAL with synchronous=NORMAL keeps those commits cheap and lets readers work alongside a writer
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS search_results (
+                key TEXT PRIMARY KEY,
+                track_id TEXT,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self.connection.execute("CREATE INDEX IF NOT EXISTS search_results_last_used ON search_results (last_used)")
+
+    def get(self, title, artist):
+        """Return (found, track_id). found is False when the pair has to be searched for."""
+        key = normalize_key(title, artist)
+        now = time.time()
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT track_id, created FROM search_results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (row[0] is None and now - row[1] > self.negative_ttl):
+                self.misses += 1
+                return False, None
+            self.connection.execute("UPDATE search_results SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return True, row[0]
+
+    def put(self, title, artist, track_id):
+        """Store a search result, using None for tracks that could not be found."""
+        now = time.time()
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO search_results (key, track_id, created, last_used) VALUES (?, ?, ?, ?)",
+                (normalize_key(title, artist), track_id, now, now)
+            )
+
+    def evict(self):
+        """Drop the least recently used entries beyond max_entries."""
+        with self.lock:
+            count = self.connection.execute("SELECT COUNT(*) FROM search_results").fetchone()[0]
+            if count > self.max_entries:
+                self.connection.execute(
+                    "DELETE FROM search_results WHERE key IN "
+                    "(SELECT key FROM search_results ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+            return max(0, count - self.max_entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    def close(self):
+        """Evict old entries and close the database."""
+        self.evict()
+        with self.lock:
+            self.connection.close()
@@ -1,131 +1,339 @@
-from playwright.sync_api import sync_playwright
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import base64
 import time
 import json
+import os
+from urllib.parse import urlparse
 
+from metrics import metrics
+from track_writer import TRACK_COLUMNS, TrackWriter, PositionBuffer, output_file
 from config import (
     playlist_url,
     max_attempts,
-    run_headless
+    gap_refetch_passes,
+    run_headless,
+    fetch_concurrency,
+    fetch_rate_limit,
+    fetch_retries,
+    extraction_mode,
+    har_replay_path,
+    consent_state_path,
+    lean_browser,
+    scrape_segments
 )
 
-def scroll_and_load_all_tracks(page):
-    """Scroll gradually to load all tracks dynamically."""
-    previous_count = 0
-    attempts = 0
-    
-    try:
-        page.click('body')
-        page.wait_for_timeout(500)
-    except:
-        pass
-    
-    print("Testing basic scrolling functionality ...")
-    initial_scroll = page.evaluate("window.pageYOffset")
-    page.evaluate("window.scrollBy(0, 100)")
-    page.wait_for_timeout(500)
-    after_scroll = page.evaluate("window.pageYOffset")
-    print(f"Basic scroll test: {initial_scroll} -> {after_scroll}")
-    
-    scrollable_elements = page.evaluate("""
-        () => {
-            const elements = [];
-            document.querySelectorAll('*').forEach(el => {
-                if (el.scrollHeight > el.clientHeight) {
-                    const style = window.getComputedStyle(el);
-                    if (style.overflowY === 'scroll' || style.overflowY === 'auto' || style.overflow === 'auto') {
-                        elements.push({
-                            tag: el.tagName,
-                            class: el.className,
-                            id: el.id,
-                            scrollHeight: el.scrollHeight,
-                            clientHeight: el.clientHeight,
-                            selector: el.tagName.toLowerCase() + 
-                                     (el.id ? '#' + el.id : '') + 
-                                     (el.className ? '.' + el.className.split(' ').join('.') : '')
+current_count = 0
+song_count_total = 0
+validation_check = False
+
+# How long a scroll step waits for the tracklist to render new rows before giving up (ms)
+SCROLL_IDLE_TIMEOUT = 1000
+
+# Accept buttons of the cookie consent banner, raced together as one selector
+COOKIE_ACCEPT_SELECTORS = [
+    'button[id*="onetrust-accept"]',
+    'button[data-testid="cookie-accept-all"]',
+    'button:has-text("Accept All")',
+    'button:has-text("Accept all cookies")',
+    'button:has-text("Accept")',
+    '#onetrust-accept-btn-handler',
+    '.onetrust-close-btn-handler',
+    'button[aria-label*="Accept"]'
+]
+
+# Cookie the consent banner sets once it has been answered
+CONSENT_COOKIE = "OptanonAlertBoxClosed"
+
+# How long to wait for the cookie banner to appear before assuming there is none (ms)
+CONSENT_TIMEOUT = 4000
+
+# Reads the rendered tracklist rows that have not been sent back to Python yet. Spotify
+# virtualizes long lists, so this runs on every scroll step before rows get unmounted.
+HARVEST_ROWS_SCRIPT = """
+    () => {
+        const seen = window.__harvestedRows || (window.__harvestedRows = new Set());
+        const rows = [];
+        
+        const trackSelectors = [
+            '[data-testid="tracklist-row"]',
+            '[role="row"]',
+            '.tracklist-row',
+            'div[data-testid*="track"]'
+        ];
+        
+        let trackElements = [];
+        for (const selector of trackSelectors) {
+            trackElements = document.querySelectorAll(selector);
+            if (trackElements.length > 0) {
+                break;
+            }
+        }
+        
+        trackElements.forEach(track => {
+            try {
+                let titleElement = track.querySelector('a[data-testid="internal-track-link"]') ||
+                                 track.querySelector('[data-testid="track-title"]') ||
+                                 track.querySelector('a[href*="/track/"]') ||
+                                 track.querySelector('.track-name a');
+                
+                let artistElements = track.querySelectorAll('a[href*="/artist/"]') ||
+                                   track.querySelectorAll('[data-testid="track-artist"] a') ||
+                                   track.querySelectorAll('.artist-name a');
+                
+                if (titleElement) {
+                    const title = titleElement.textContent.trim();
+                    const artists = Array.from(artistElements).map(a => a.textContent.trim()).filter(name => name).join(', ');
+                    const url = titleElement.href || '';
+                    const holder = track.closest('[aria-rowindex]');
+                    const index = holder ? parseInt(holder.getAttribute('aria-rowindex'), 10) - 1 : null;
+                    const key = index !== null ? 'row:' + index : 'url:' + url;
+                    
+                    if (title && !seen.has(key)) {
+                        seen.add(key);
+                        rows.push({
+                            title: title,
+                            artists: artists || 'Unknown Artist',
+                            url: url,
+                            index: index
                         });
                     }
                 }
+            } catch (e) {
+                console.log('Error processing track:', e);
+            }
+        });
+        
+        return rows;
+    }
+"""
+
+class TrackStore:
+    """Deduplicated tracks harvested while scrolling, keyed by row index or track URL.
+
+    Positions that hold no track (skipped rows, and gaps given up on) are remembered
+    separately and passed to on_skip, so whatever is waiting for them can move on.
+    """
+    def __init__(self, on_track=None, on_skip=None):
+        self.tracks = {}
+        self.skipped = set()
+        self.on_track = on_track
+        self.on_skip = on_skip
+
+    def add(self, rows):
+        """Add harvested rows, returning how many of them were new."""
+        added = 0
+        for row in rows:
+            if row.get("skipped"):
+                self.skip([row["index"]])
+                continue
+            key = row["index"] if row.get("index") is not None else row["url"]
+            if key in self.tracks:
+                continue
+            self.tracks[key] = row
+            added += 1
+            if self.on_track:
+                self.on_track(row)
+        return added
+
+    def skip(self, positions):
+        """Record positions that will never get a track."""
+        positions = [position for position in positions if position not in self.skipped and position not in self.tracks]
+        self.skipped.update(positions)
+        if positions and self.on_skip:
+            self.on_skip(positions)
+
+    def ordered(self):
+        """Return the stored tracks in playlist order, unindexed rows last."""
+        indexed = sorted((row for row in self.tracks.values() if row.get("index") is not None),
+                         key=lambda row: row["index"])
+        unindexed = [row for row in self.tracks.values() if row.get("index") is None]
+        return indexed + unindexed
+
+    def __len__(self):
+        return len(self.tracks)
+
+SCROLL_STEP_SCRIPT = """
+    ([selector, idleTimeout]) => new Promise(resolve => {
+        const harvestRows = """ + HARVEST_ROWS_SCRIPT + """;
+        const counts = () => {
+            let lastRow = 0;
+            document.querySelectorAll('[data-testid="tracklist-row"]').forEach(row => {
+                const holder = row.closest('[aria-rowindex]');
+                if (holder) {
+                    lastRow = Math.max(lastRow, parseInt(holder.getAttribute('aria-rowindex'), 10) - 1);
+                }
             });
-            return elements;
-        }
-    """)
-    
+            return {
+                meta: document.querySelectorAll('meta[name="music:song"]').length,
+                dom: document.querySelectorAll('[data-testid="tracklist-row"]').length,
+                lastRow: lastRow
+            };
+        };
+
+        const container = selector ? document.querySelector(selector) : null;
+        const target = container || document.scrollingElement;
+        const firstRow = document.querySelector('[data-testid="tracklist-row"]');
+        const rowHeight = (firstRow && firstRow.getBoundingClientRect().height) || 56;
+        const visibleRows = Math.max(1, Math.floor(target.clientHeight * 0.8 / rowHeight));
+
+        const start = counts();
+        const harvested = harvestRows();
+        const before = target.scrollTop;
+        target.scrollBy(0, visibleRows * rowHeight);
+        const scrolled = target.scrollTop > before;
+        const atBottom = target.scrollTop + target.clientHeight >= target.scrollHeight - 2;
+
+        let timer = null;
+        let done = false;
+        const observer = new MutationObserver(() => {
+            const now = counts();
+            if (now.meta !== start.meta || now.dom !== start.dom || now.lastRow !== start.lastRow) {
+                requestAnimationFrame(finish);
+            }
+        });
+        const finish = () => {
+            // The timeout and queued animation frames can all call this, only the first may harvest
+            if (done) {
+                return;
+            }
+            done = true;
+            observer.disconnect();
+            clearTimeout(timer);
+            resolve({...counts(), rows: harvested.concat(harvestRows()), scrolled: scrolled, atBottom: atBottom});
+        };
+        observer.observe(document.body, {childList: true, subtree: true});
+        timer = setTimeout(finish, idleTimeout);
+    })
+"""
+
+# Fewest tracks worth giving a page of its own when a playlist is scraped in segments
+SEGMENT_MIN_TRACKS = 500
+
+# Missing positions this close together are re-fetched in one pass over the tracklist
+GAP_MERGE_DISTANCE = 20
+
+# Scrolls the tracklist so the given playlist position is at the top of the view
+JUMP_TO_ROW_SCRIPT = """
+    ([selector, index]) => {
+        const container = selector ? document.querySelector(selector) : null;
+        const target = container || document.scrollingElement;
+        const tracklist = document.querySelector('[data-testid="playlist-tracklist"]');
+        const firstRow = document.querySelector('[data-testid="tracklist-row"]');
+        const rowHeight = (firstRow && firstRow.getBoundingClientRect().height) || 56;
+        const listTop = tracklist
+            ? tracklist.getBoundingClientRect().top - target.getBoundingClientRect().top + target.scrollTop
+            : 0;
+        target.scrollTop = listTop + (index - 1) * rowHeight;
+        return target.scrollTop;
+    }
+"""
+
+# Lists the scrollable elements of the page, to find the one that scrolls the tracklist
+SCROLLABLE_ELEMENTS_SCRIPT = """
+    () => {
+        const elements = [];
+        document.querySelectorAll('*').forEach(el => {
+            if (el.scrollHeight > el.clientHeight) {
+                const style = window.getComputedStyle(el);
+                if (style.overflowY === 'scroll' || style.overflowY === 'auto' || style.overflow === 'auto') {
+                    elements.push({
+                        tag: el.tagName,
+                        class: el.className,
+                        id: el.id,
+                        scrollHeight: el.scrollHeight,
+                        clientHeight: el.clientHeight,
+                        selector: el.tagName.toLowerCase() + 
+                                 (el.id ? '#' + el.id : '') + 
+                                 (el.className ? '.' + el.className.split(' ').join('.') : '')
+                    });
+                }
+            }
+        });
+        return elements;
+    }
+"""
+
+def pick_scroll_container(scrollable_elements):
+    """Choose the tracklist's scroll container from the scrollable elements found on the page."""
     print("Found scrollable elements:")
     for elem in scrollable_elements[:5]:
         print(f"  - {elem}")
     
-    main_container = None
     for elem in scrollable_elements:
         if any(keyword in elem.get('class', '').lower() for keyword in ['main', 'content', 'scroll', 'tracklist']):
-            main_container = elem['selector']
-            print(f"Selected main container: {main_container}")
-            break
+            print(f"Selected main container: {elem['selector']}")
+            return elem['selector']
+    
+    if scrollable_elements:
+        print(f"Using first scrollable element: {scrollable_elements[0]['selector']}")
+        return scrollable_elements[0]['selector']
+    return None
+
+def find_scroll_container(page):
+    """Find the element that scrolls the tracklist, if it is not the window itself."""
+    return pick_scroll_container(page.evaluate(SCROLLABLE_ELEMENTS_SCRIPT))
+
+@metrics.timed("scrape.scroll")
+def scroll_and_load_all_tracks(page, expected_total=None, store=None, count_meta=False):
+    """Scroll through the tracklist, harvesting rows into the store as soon as they render.
+
+    Progress is measured by the rows that have actually loaded. The music:song meta
+    tags are only counted with count_meta, for the metadata fallback that reads them,
+    since the page head often lists every track before any row past the first screen renders.
+    """
+    global current_count
+    previous_count = 0
+    attempts = 0
+    
+    if expected_total is None:
+        expected_total = song_count_total if validation_check else 0
+    if store is None:
+        store = TrackStore()
+    
+    try:
+        page.click('body')
+    except:
+        pass
+    
+    page.evaluate("window.__harvestedRows = new Set()")
     
-    if not main_container and scrollable_elements:
-        main_container = scrollable_elements[0]['selector']
-        print(f"Using first scrollable element: {main_container}")
+    main_container = find_scroll_container(page)
     
     while attempts < max_attempts:
-        old_meta = page.locator('meta[name="music:song"]').count()
-        old_dom = page.locator('[data-testid="tracklist-row"]').count()
-        
         try:
-            scrolled = False
-            
-            if main_container:
-                result = page.evaluate(f"""
-                    (() => {{
-                        const el = document.querySelector('{main_container.replace("'", "\\'")}');
-                        if (el) {{
-                            const before = el.scrollTop;
-                            el.scrollBy(0, 400);
-                            const after = el.scrollTop;
-                            console.log('Container scroll:', before, '->', after);
-                            return after > before;
-                        }}
-                        return false;
-                    }})()
-                """)
-                scrolled = result
-                print(f"Container scroll result: {result}")
-            
-            if not scrolled:
-                before = page.evaluate("window.pageYOffset")
-                page.evaluate("window.scrollBy(0, 400)")
-                after = page.evaluate("window.pageYOffset")
-                scrolled = after > before
-                print(f"Window scroll: {before} -> {after}")
-            
-            if not scrolled:
-                page.keyboard.press("PageDown")
-                page.wait_for_timeout(300)
-                print("Used PageDown key")
-                scrolled = True
-            
-            page.wait_for_timeout(1500)
-            
+            state = page.evaluate(SCROLL_STEP_SCRIPT, [main_container, SCROLL_IDLE_TIMEOUT])
         except Exception as e:
             print(f"Scrolling error: {e}")
+            attempts += 1
+            continue
         
-        new_meta = page.locator('meta[name="music:song"]').count()
-        new_dom = page.locator('[data-testid="tracklist-row"]').count()
-        global current_count
-        current_count = max(new_meta, new_dom)
+        if not state["scrolled"] and not state["atBottom"]:
+            page.keyboard.press("PageDown")
+            print("Used PageDown key")
         
-        print(f"Track count: {current_count} (meta: {old_meta}->{new_meta}, dom: {old_dom}->{new_dom})")
+        store.add(state["rows"])
+        current_count = max(state["lastRow"], len(store))
+        if count_meta:
+            current_count = max(current_count, state["meta"])
+        print(f"Track count: {current_count} (meta: {state['meta']}, dom: {state['dom']}, last row: {state['lastRow']}, harvested: {len(store)})")
         
-        if current_count == previous_count:
-            attempts += 1
-            print(f"No new tracks, attempt {attempts}/{max_attempts}")
-        else:
+        if expected_total and current_count >= expected_total:
+            print(f"Reached the playlist total of {expected_total} tracks")
+            break
+        
+        if current_count > previous_count:
             print(f"Found {current_count - previous_count} new tracks")
-            attempts = max(0, attempts - 2)
+            attempts = 0
             previous_count = current_count
+        elif state["atBottom"] or not state["scrolled"]:
+            attempts += 1
+            print(f"No new tracks, attempt {attempts}/{max_attempts}")
     
     print(f"Final count: {current_count} tracks")
     return current_count
 
+@metrics.timed("scrape.song_count")
 def total_songs_playlist(page):
     global song_count_total
     global validation_check
@@ -157,6 +365,7 @@ def total_songs_playlist(page):
     song_count_total = 0
     return 0
 
+@metrics.timed("scrape.track_urls")
 def get_track_urls(page):
     """Extract track URLs from meta tags."""
     url_elements = page.locator('meta[name="music:song"]')
@@ -170,286 +379,760 @@ def get_track_urls(page):
             urls.append(url)
     return urls
 
-def get_tracks_from_dom(page):
-    """Extract track information directly from DOM elements."""
+def get_tracks_from_dom(page, store=None, expected_total=None):
+    """Extract track information from the tracklist rows harvested while scrolling."""
+    if store is None:
+        store = TrackStore()
     try:
         page.wait_for_selector('[data-testid="playlist-tracklist"]', timeout=10000)
-        handle_cookie_banner(page)
+        handle_cookie_banner(page, wait=False)
         
         print("Scrolling to load all tracks ...")
-        total_tracks = scroll_and_load_all_tracks(page)
+        total_tracks = scroll_and_load_all_tracks(page, expected_total=expected_total, store=store)
         print(f"Finished scrolling, found {total_tracks} tracks")
         
-        page.wait_for_timeout(2000)
+        with metrics.span("scrape.dom_extract"):
+            store.add(page.evaluate(HARVEST_ROWS_SCRIPT))
+        print(f"Successfully harvested {len(store)} tracks")
         
-        tracks = page.evaluate("""
-            () => {
-                const tracks = [];
-                
-                const trackSelectors = [
-                    '[data-testid="tracklist-row"]',
-                    '[role="row"]',
-                    '.tracklist-row',
-                    'div[data-testid*="track"]'
-                ];
-                
-                let trackElements = [];
-                for (const selector of trackSelectors) {
-                    trackElements = document.querySelectorAll(selector);
-                    if (trackElements.length > 0) {
-                        console.log(`Found ${trackElements.length} tracks using selector: ${selector}`);
-                        break;
-                    }
-                }
-                
-                trackElements.forEach((track, index) => {
-                    try {
-                        let titleElement = track.querySelector('a[data-testid="internal-track-link"]') ||
-                                         track.querySelector('[data-testid="track-title"]') ||
-                                         track.querySelector('a[href*="/track/"]') ||
-                                         track.querySelector('.track-name a');
-                        
-                        let artistElements = track.querySelectorAll('a[href*="/artist/"]') ||
-                                           track.querySelectorAll('[data-testid="track-artist"] a') ||
-                                           track.querySelectorAll('.artist-name a');
-                        
-                        if (titleElement) {
-                            const title = titleElement.textContent.trim();
-                            const artists = Array.from(artistElements).map(a => a.textContent.trim()).filter(name => name).join(', ');
-                            const url = titleElement.href;
-                            
-                            if (title) {
-                                tracks.push({
-                                    title: title,
-                                    artists: artists || 'Unknown Artist',
-                                    url: url || '',
-                                    index: index + 1
-                                });
-                            }
-                        }
-                    } catch (e) {
-                        console.log('Error processing track:', e);
-                    }
-                });
-                
-                console.log(`Successfully extracted ${tracks.length} tracks`);
-                return tracks;
-            }
-        """)
-        
-        return tracks
+        return store.ordered()
     except Exception as e:
         print(f"Error extracting from DOM: {e}")
-        return []
+        return store.ordered()
+
+def segment_bounds(total, segments=scrape_segments):
+    """Split playlist positions 1..total into (first, last) ranges, one per page."""
+    count = max(1, min(segments, total // SEGMENT_MIN_TRACKS))
+    starts = [1 + i * total // count for i in range(count)]
+    return [(start, (starts[i + 1] - 1) if i + 1 < count else total) for i, start in enumerate(starts)]
+
+async def scroll_harvest(page, selector, store, last=None, attempts_allowed=max_attempts):
+    """Scroll an async page down from where it is, harvesting rows until the last position renders.
 
-def fetch_track_data(playwright, track_url):
-    """Fetch detailed track data from individual track pages."""
+    Without a last position it scrolls until nothing new appears at the bottom.
+    """
+    attempts = 0
+    while attempts < attempts_allowed:
+        state = await page.evaluate(SCROLL_STEP_SCRIPT, [selector, SCROLL_IDLE_TIMEOUT])
+        if store.add(state["rows"]):
+            attempts = 0
+        elif state["atBottom"] or not state["scrolled"]:
+            attempts += 1
+        if last and state["lastRow"] >= last:
+            break
+    return len(store)
+
+async def harvest_segment(context, url, selector, first, last, store, attempts_allowed=max_attempts):
+    """Open the playlist in a new page, jump to the first position and harvest rows up to the last."""
+    page = await context.new_page()
     try:
-        browser = playwright.chromium.launch(headless=True)
-        context = browser.new_context()
-        page = context.new_page()
-        page.goto(track_url, timeout=30000)
-        page.wait_for_timeout(1000)
-
-        title = page.locator('meta[property="og:title"]').get_attribute("content")
-        artist = page.locator('meta[name="music:musician_description"]').get_attribute("content")
-        
-        if not title:
-            title = page.locator('h1[data-testid="entityTitle"]').text_content()
-        
-        if not artist:
-            artist_elements = page.locator('a[href*="/artist/"]')
-            if artist_elements.count() > 0:
-                artists = []
-                for i in range(artist_elements.count()):
-                    artists.append(artist_elements.nth(i).text_content())
-                artist = ", ".join(artists)
+        await page.goto(url, timeout=30000)
+        await page.wait_for_selector('[data-testid="tracklist-row"]', timeout=15000)
+        await page.evaluate(JUMP_TO_ROW_SCRIPT, [selector, first])
+        await scroll_harvest(page, selector, store, last, attempts_allowed)
+        print(f"Finished segment {first}-{last}, {len(store)} tracks harvested so far")
+    finally:
+        await page.close()
 
-        browser.close()
+async def harvest_segments(url, selector, bounds, store, headless=True, storage_state=None):
+    """Harvest every segment of the playlist at the same time, each in its own page of one browser."""
+    from playwright.async_api import async_playwright
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(headless=headless, args=LEAN_BROWSER_ARGS if lean_browser else [])
+        context = await browser.new_context(
+            viewport=LEAN_VIEWPORT if lean_browser else {'width': 1920, 'height': 1080},
+            user_agent=BROWSER_USER_AGENT,
+            storage_state=storage_state,
+            reduced_motion="reduce" if lean_browser else None
+        )
+        if lean_browser:
+            await context.route("**/*", block_heavy_resources_async)
+        results = await asyncio.gather(*(harvest_segment(context, url, selector, first, last, store)
+                                         for first, last in bounds), return_exceptions=True)
+        for (first, last), result in zip(bounds, results):
+            if isinstance(result, Exception):
+                print(f"Segment {first}-{last} failed: {result}")
+        await browser.close()
 
-        if title and artist:
-            return {
-                "Title": title.strip(),
-                "Artist(s)": artist.strip(),
-                "URL": track_url
-            }
+@metrics.timed("scrape.segments")
+def get_tracks_in_segments(page, url, song_total, store, headless=True):
+    """Scrape a large playlist with several pages at once, each starting at a different position.
+
+    The segments are merged in the store, which drops rows harvested twice where
+    segments overlap.
+    """
+    bounds = segment_bounds(song_total)
+    print(f"Scraping {song_total} tracks in {len(bounds)} segments at the same time ...")
+    selector = find_scroll_container(page)
+    storage_state = page.context.storage_state()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        executor.submit(asyncio.run, harvest_segments(url, selector, bounds, store, headless, storage_state)).result()
+    
+    print(f"Harvested {len(store)} of {song_total} positions across the segments")
+    return store.ordered()
+
+def missing_positions(store, total):
+    """Playlist positions 1..total that no harvested row has."""
+    found = {row["index"] for row in store.tracks.values() if row.get("index") is not None} | store.skipped
+    return [position for position in range(1, total + 1) if position not in found]
+
+def gap_ranges(positions, merge_distance=GAP_MERGE_DISTANCE):
+    """Group sorted positions into (first, last) ranges, joining ranges that are close together."""
+    ranges = []
+    for position in positions:
+        if ranges and position - ranges[-1][1] <= merge_distance:
+            ranges[-1][1] = position
         else:
-            print(f"Missing data for {track_url}")
-    except Exception as e:
-        print(f"Error fetching data for {track_url}: {e}")
-    return None
+            ranges.append([position, position])
+    return [(first, last) for first, last in ranges]
+
+def harvest_range(page, selector, store, first, last):
+    """Jump to a range of playlist positions and scroll through it, harvesting its rows."""
+    # Start a few rows early, the jump only estimates where a position is from the row height
+    page.evaluate(JUMP_TO_ROW_SCRIPT, [selector, max(1, first - 5)])
+    stalled = 0
+    while stalled < max_attempts:
+        state = page.evaluate(SCROLL_STEP_SCRIPT, [selector, SCROLL_IDLE_TIMEOUT])
+        store.add(state["rows"])
+        if state["lastRow"] >= last:
+            break
+        if state["atBottom"] or not state["scrolled"]:
+            stalled += 1
+
+@metrics.timed("scrape.gap_refetch")
+def refetch_gaps(page, store, total, passes=gap_refetch_passes, dom_store=None):
+    """Re-fetch only the playlist positions missing from the store, instead of scraping it again.
+
+    Positions are known from the rows' aria-rowindex, so gaps can only be found when the
+    harvested rows have one. With a separate dom_store (network mode, where scrolling
+    to a gap makes the page request it and the response fills the store), rendered rows
+    are kept there and only used for positions no response covered. Returns the
+    positions that are still missing.
+    """
+    missing = positions_to_refetch(store, total)
+    if not missing:
+        return []
+    
+    selector = find_scroll_container(page)
+    first_missing = len(missing)
+    for attempt in range(passes):
+        ranges = gap_ranges(missing)
+        print(f"Re-fetching {len(missing)} missing tracks in {len(ranges)} gaps (pass {attempt + 1}/{passes}) ...")
+        for first, last in ranges:
+            try:
+                harvest_range(page, selector, dom_store if dom_store is not None else store, first, last)
+            except Exception as e:
+                print(f"Could not re-fetch positions {first}-{last}: {e}")
+        missing = missing_positions(store, total)
+        if not missing:
+            break
+    return finish_refetch(store, total, first_missing, dom_store)
+
+async def refetch_gaps_async(page, selector, store, total, passes=gap_refetch_passes, attempts_allowed=max_attempts,
+                             dom_store=None):
+    """refetch_gaps for an async page, harvesting each missing range with scroll_harvest."""
+    missing = positions_to_refetch(store, total)
+    if not missing:
+        return []
+    
+    first_missing = len(missing)
+    for attempt in range(passes):
+        ranges = gap_ranges(missing)
+        print(f"Re-fetching {len(missing)} missing tracks in {len(ranges)} gaps (pass {attempt + 1}/{passes}) ...")
+        for first, last in ranges:
+            try:
+                await page.evaluate(JUMP_TO_ROW_SCRIPT, [selector, max(1, first - 5)])
+                await scroll_harvest(page, selector, dom_store if dom_store is not None else store, last,
+                                     attempts_allowed)
+            except Exception as e:
+                print(f"Could not re-fetch positions {first}-{last}: {e}")
+        missing = missing_positions(store, total)
+        if not missing:
+            break
+    return finish_refetch(store, total, first_missing, dom_store)
 
-def handle_cookie_banner(page):
-    """Handle cookie consent banners that might interfere with scrolling."""
+def positions_to_refetch(store, total):
+    """The missing positions, or none when the store's rows carry no position to compare with."""
+    if not total or not any(row.get("index") is not None for row in store.tracks.values()):
+        return []
+    return missing_positions(store, total)
+
+def finish_refetch(store, total, first_missing, dom_store=None):
+    """Fill what is still missing from dom_store, then report and return the positions left."""
+    missing = missing_positions(store, total)
+    if missing and dom_store is not None:
+        missing_set = set(missing)
+        store.add([row for row in dom_store.ordered() if row.get("index") in missing_set])
+        missing = missing_positions(store, total)
+    
+    metrics.count("scrape.gaps_recovered", first_missing - len(missing))
+    metrics.count("scrape.gaps_missing", len(missing))
+    print(f"Recovered {first_missing - len(missing)} of {first_missing} missing tracks")
+    if missing:
+        report_missing(store, missing)
+        store.skip(missing)
+    return missing
+
+def report_missing(store, missing):
+    """Say which playlist positions could not be recovered, next to the tracks around them."""
+    by_index = {row["index"]: row for row in store.tracks.values() if row.get("index") is not None}
+    print(f"Could not recover {len(missing)} tracks:")
+    for first, last in gap_ranges(missing, merge_distance=1):
+        before = by_index.get(first - 1)
+        after = by_index.get(last + 1)
+        positions = f"{first}" if first == last else f"{first}-{last}"
+        print(f"  - position {positions}"
+              + (f", after '{before['title']}' by {before['artists']}" if before else "")
+              + (f", before '{after['title']}' by {after['artists']}" if after else ""))
+
+class RateLimiter:
+    """Spaces out requests shared between async workers to a maximum rate per second."""
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0
+        self.next_slot = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self.lock:
+            now = time.monotonic()
+            delay = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+async def read_track_page(page, track_url):
+    """Read title and artist from a track page using an already open page."""
+    await page.goto(track_url, timeout=30000, wait_until="domcontentloaded")
+
+    title = await page.locator('meta[property="og:title"]').get_attribute("content", timeout=10000)
+    artist_meta = page.locator('meta[name="music:musician_description"]')
+    artist = await artist_meta.get_attribute("content") if await artist_meta.count() > 0 else None
+
+    if not title:
+        title = await page.locator('h1[data-testid="entityTitle"]').text_content()
+
+    if not artist:
+        artists = await page.locator('a[href*="/artist/"]').all_text_contents()
+        artist = ", ".join(artists)
+
+    if title and artist:
+        return {
+            "Title": title.strip(),
+            "Artist(s)": artist.strip(),
+            "URL": track_url
+        }
+    raise ValueError("missing title or artist")
+
+async def fetch_all_track_data(track_urls, headless=True, concurrency=fetch_concurrency, rate_limit=fetch_rate_limit,
+                               retries=fetch_retries, browser=None, storage_state=None, lean=lean_browser):
+    """Fetch track pages with a fixed pool of pages in one browser, keeping playlist order.
+
+    A browser that is passed in is used and left open, otherwise one is launched for
+    the pool. Every page starts from the given storage state.
+    """
+    from playwright.async_api import async_playwright
+    results = [None] * len(track_urls)
+    queue = asyncio.Queue()
+    for index, url in enumerate(track_urls):
+        queue.put_nowait((index, url))
+
+    limiter = RateLimiter(rate_limit)
+    completed = 0
+
+    async def worker():
+        nonlocal completed
+        context = await browser.new_context(storage_state=storage_state)
+        if lean:
+            await context.route("**/*", block_heavy_resources_async)
+        page = await context.new_page()
+        while True:
+            try:
+                index, url = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+
+            for attempt in range(retries + 1):
+                await limiter.wait()
+                try:
+                    results[index] = await read_track_page(page, url)
+                    break
+                except Exception as e:
+                    if attempt < retries:
+                        metrics.count("scrape.track_page_retries")
+                        backoff = 2 ** attempt
+                        print(f"Retrying {url} in {backoff}s ({attempt + 1}/{retries}): {e}")
+                        await asyncio.sleep(backoff)
+                    else:
+                        metrics.count("scrape.track_page_failures")
+                        print(f"Error fetching data for {url}: {e}")
+
+            completed += 1
+            print(f"Progress: {completed}/{len(track_urls)}")
+        await context.close()
+
+    workers = max(1, min(concurrency, len(track_urls)))
+    if browser:
+        await asyncio.gather(*(worker() for _ in range(workers)))
+    else:
+        async with async_playwright() as playwright:
+            browser = await playwright.chromium.launch(headless=headless, args=LEAN_BROWSER_ARGS if lean else [])
+            await asyncio.gather(*(worker() for _ in range(workers)))
+            await browser.close()
+
+    return [info for info in results if info]
+
+# GraphQL operations the web player uses to page through a playlist's tracks
+PLAYLIST_CONTENT_OPERATIONS = ("fetchPlaylist", "fetchPlaylistContents", "fetchPlaylistWithGatedEntityRelations")
+
+# Resource types that are never needed to read the tracklist, meta tags or playlist JSON
+BLOCKED_RESOURCE_TYPES = ("image", "media", "font")
+
+# Third-party analytics and advertising hosts the pages load but the scraper never needs
+TRACKER_HOSTS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "googlesyndication.com",
+    "facebook.net", "facebook.com", "hotjar.com", "branch.io", "scorecardresearch.com",
+    "adsrvr.org", "bat.bing.com", "sentry.io", "analytics.tiktok.com", "sc-static.net"
+)
+
+BROWSER_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+# Taller than a normal window, so every scroll step renders more tracklist rows
+LEAN_VIEWPORT = {'width': 1280, 'height': 2400}
+
+LEAN_BROWSER_ARGS = ['--disable-gpu', '--disable-extensions', '--mute-audio']
+
+# Turns off CSS animations and transitions, so rows are readable as soon as they render
+NO_ANIMATIONS_SCRIPT = """
+    document.addEventListener('DOMContentLoaded', () => {
+        const style = document.createElement('style');
+        style.textContent = '*, *::before, *::after { animation: none !important; transition: none !important; scroll-behavior: auto !important; }';
+        document.head.appendChild(style);
+    });
+"""
+
+def should_block(request):
+    """Whether a request is for an image, media, font or a third-party tracker."""
+    if request.resource_type in BLOCKED_RESOURCE_TYPES:
+        return True
+    host = urlparse(request.url).hostname or ""
+    return any(host == tracker or host.endswith("." + tracker) for tracker in TRACKER_HOSTS)
+
+def block_heavy_resources(route):
+    """Abort requests for images, media, fonts and trackers, passing everything else to the next handler."""
+    if should_block(route.request):
+        route.abort()
+    else:
+        route.fallback()
+
+async def block_heavy_resources_async(route):
+    if should_block(route.request):
+        await route.abort()
+    else:
+        await route.fallback()
+
+def watch_transfer(page):
+    """Count the requests a page makes and the bytes it downloads, returning the running totals."""
+    transfer = {"requests": 0, "bytes": 0, "blocked": 0}
+
+    def on_finished(request):
+        try:
+            sizes = request.sizes()
+            size = sizes["responseBodySize"] + sizes["responseHeadersSize"]
+        except Exception:
+            size = 0
+        transfer["requests"] += 1
+        transfer["bytes"] += size
+        metrics.count("browser.requests")
+        metrics.count("browser.bytes", size)
+
+    def on_failed(request):
+        transfer["blocked"] += 1
+        metrics.count("browser.blocked")
+
+    page.on("requestfinished", on_finished)
+    page.on("requestfailed", on_failed)
+    return transfer
+
+def is_playlist_content_request(url, post_data=None):
+    """Check whether a request is one of the web player's playlist content queries."""
+    if "pathfinder" not in url:
+        return False
+    text = url + (post_data or "")
+    return any(f'operationName={name}' in text or f'"operationName":"{name}"' in text
+               for name in PLAYLIST_CONTENT_OPERATIONS)
+
+def parse_playlist_items(payload):
+    """Parse tracks from a playlist content JSON response, keyed by their playlist position."""
+    content = (((payload or {}).get("data") or {}).get("playlistV2") or {}).get("content") or {}
+    offset = (content.get("pagingInfo") or {}).get("offset", 0)
+    tracks = []
+    for position, item in enumerate(content.get("items") or []):
+        data = ((item.get("itemV2") or {}).get("data")) or {}
+        if data.get("__typename", "Track") != "Track" or not data.get("name"):
+            # Episodes and local files hold a position but are not tracks
+            tracks.append({"index": offset + position + 1, "skipped": True})
+            continue
+
+        uri = data.get("uri", "")
+        artists = [artist.get("profile", {}).get("name", "")
+                   for artist in (data.get("artists") or {}).get("items", [])]
+        isrc = ""
+        for external_id in (data.get("externalIds") or {}).get("items", []):
+            if external_id.get("type", "").lower() == "isrc":
+                isrc = external_id.get("id", "")
+
+        tracks.append({
+            "title": data["name"],
+            "artists": ", ".join(name for name in artists if name) or "Unknown Artist",
+            "url": f"https://open.spotify.com/track/{uri.split(':')[-1]}" if uri else "",
+            "index": offset + position + 1,
+            "album": (data.get("albumOfTrack") or {}).get("name", ""),
+            "duration_ms": (data.get("trackDuration") or {}).get("totalMilliseconds"),
+            "isrc": isrc
+        })
+    return tracks
+
+def watch_playlist_responses(page, store):
+    """Feed every playlist content response the page receives into the store."""
+    def on_response(response):
+        try:
+            if is_playlist_content_request(response.url, response.request.post_data):
+                metrics.count("scrape.playlist_responses")
+                added = store.add(parse_playlist_items(response.json()))
+                print(f"Captured {added} tracks from {response.url.split('?')[0]}")
+        except Exception as e:
+            print(f"Could not read playlist response: {e}")
+
+    page.on("response", on_response)
+
+def extract_tracks_from_har(har_path):
+    """Read tracks from the playlist content responses recorded in a HAR file."""
+    with open(har_path, encoding="utf-8") as f:
+        har = json.load(f)
+
+    store = TrackStore()
+    for entry in har.get("log", {}).get("entries", []):
+        request = entry.get("request", {})
+        post_data = (request.get("postData") or {}).get("text")
+        if not is_playlist_content_request(request.get("url", ""), post_data):
+            continue
+
+        content = entry.get("response", {}).get("content", {})
+        text = content.get("text")
+        if not text:
+            continue
+        if content.get("encoding") == "base64":
+            text = base64.b64decode(text).decode("utf-8")
+        store.add(parse_playlist_items(json.loads(text)))
+    return store.ordered()
+
+def track_records(tracks):
+    """Convert harvested track rows into the records written to the CSV/JSON output."""
+    records = []
+    for track in tracks:
+        record = {
+            "Title": track["title"],
+            "Artist(s)": track["artists"],
+            "URL": track["url"]
+        }
+        if "album" in track:
+            record["Album"] = track["album"]
+            record["Duration (ms)"] = track["duration_ms"]
+            record["ISRC"] = track["isrc"]
+        records.append(record)
+    return records
+
+def has_consent(context):
+    """Whether the context already carries the cookie set once the banner is answered."""
+    return any(cookie["name"] == CONSENT_COOKIE for cookie in context.cookies())
+
+def consent_storage_state(path=consent_state_path):
+    """The saved storage state with the cookie banner already accepted, if there is one."""
+    return path if path and os.path.exists(path) else None
+
+def dismiss_overlays(page):
+    """Close any modal overlay left over when there is no cookie banner to accept."""
     try:
-        page.wait_for_timeout(3000)
+        page.keyboard.press("Escape")
         
-        cookie_selectors = [
-            'button[id*="onetrust-accept"]',
-            'button[data-testid="cookie-accept-all"]',
-            'button:has-text("Accept All")',
-            'button:has-text("Accept all cookies")',
-            'button:has-text("Accept")',
-            '#onetrust-accept-btn-handler',
-            '.onetrust-close-btn-handler',
-            'button[aria-label*="Accept"]'
+        modal_selectors = [
+            '[role="dialog"]',
+            '.modal',
+            '[data-testid="modal"]',
+            '.overlay'
         ]
         
-        for selector in cookie_selectors:
-            try:
-                cookie_button = page.locator(selector).first
-                if cookie_button.is_visible(timeout=2000):
-                    print(f"Found cookie banner, clicking: {selector}")
-                    cookie_button.click(timeout=5000)
-                    page.wait_for_timeout(2000)
-                    
-                    # Wait for the cookie banner to disappear
-                    try:
-                        cookie_button.wait_for(state='hidden', timeout=5000)
-                        print("Cookie banner dismissed successfully")
-                    except:
-                        print("Cookie banner may still be visible")
-                    
-                    return True
-            except Exception as e:
-                print(f"Failed to click {selector}: {e}")
-                continue
-                
-        # Additional fallback - try to dismiss any modal or overlay
+        for modal_selector in modal_selectors:
+            if page.locator(modal_selector).count() > 0:
+                print(f"Found modal overlay: {modal_selector}")
+                # Try to find close button in modal
+                close_buttons = page.locator(f'{modal_selector} button:has-text("Close"), {modal_selector} button[aria-label*="close"], {modal_selector} .close')
+                if close_buttons.count() > 0:
+                    close_buttons.first.click(timeout=2000)
+    except Exception as e:
+        print(f"Modal dismissal failed: {e}")
+
+@metrics.timed("scrape.cookie_banner")
+def handle_cookie_banner(page, wait=True, state_path=consent_state_path):
+    """Handle cookie consent banners that might interfere with scrolling.
+
+    All accept buttons are raced in a single locator, so this returns as soon as one
+    of them shows up, or after CONSENT_TIMEOUT if none does (immediately when wait is
+    False). Once accepted, the context's storage state is saved to state_path so later
+    contexts and runs start with consent given and never see the banner.
+    """
+    from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+    try:
+        if has_consent(page.context):
+            return True
+        
+        accept_button = page.locator(", ".join(COOKIE_ACCEPT_SELECTORS)).first
         try:
-            page.keyboard.press("Escape")
-            page.wait_for_timeout(1000)
-            
-            # Check if there are any modal overlays and try to close them
-            modal_selectors = [
-                '[role="dialog"]',
-                '.modal',
-                '[data-testid="modal"]',
-                '.overlay'
-            ]
-            
-            for modal_selector in modal_selectors:
-                modals = page.locator(modal_selector)
-                if modals.count() > 0:
-                    print(f"Found modal overlay: {modal_selector}")
-                    # Try to find close button in modal
-                    close_buttons = page.locator(f'{modal_selector} button:has-text("Close"), {modal_selector} button[aria-label*="close"], {modal_selector} .close')
-                    if close_buttons.count() > 0:
-                        close_buttons.first.click()
-                        page.wait_for_timeout(1000)
-                        
-        except Exception as e:
-            print(f"Modal dismissal failed: {e}")
+            if wait:
+                accept_button.wait_for(state="visible", timeout=CONSENT_TIMEOUT)
+            elif not accept_button.is_visible():
+                return False
+        except PlaywrightTimeoutError:
+            print("No cookie banner shown")
+            dismiss_overlays(page)
+            return False
         
+        print("Found cookie banner, accepting ...")
+        accept_button.click(timeout=5000)
+        try:
+            accept_button.wait_for(state="hidden", timeout=5000)
+            print("Cookie banner dismissed successfully")
+        except PlaywrightTimeoutError:
+            print("Cookie banner may still be visible")
+        
+        if state_path:
+            page.context.storage_state(path=state_path)
+            print(f"Saved cookie consent to {state_path}")
+        return True
     except Exception as e:
         print(f"Cookie banner handling: {e}")
     
     return False
 
-def main(headless=True):
-    """Main function to extract playlist data."""
-    with sync_playwright() as playwright:
-        browser_args = ['--disable-web-security', '--disable-blink-features=AutomationControlled']
-        
-        if not headless:
-            browser_args.append('--start-maximized')
-            
-        browser = playwright.chromium.launch(
-            headless=headless,
-            args=browser_args
-        )
-        context = browser.new_context(
-            viewport={'width': 1920, 'height': 1080} if headless else None,
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-        )
-        page = context.new_page()
-        
-        if not headless:
-            try:
-                page.set_viewport_size({'width': 1920, 'height': 1080})
-            except:
-                pass
-        
-        print("Loading playlist page ...")
-        page.goto(playlist_url, timeout=30000)
-        
-        print("Handling cookie banner ...")
-        banner_handled = handle_cookie_banner(page)
-        if not banner_handled:
-            print(f"Unsuccessfull, attempting one more time ...")
-            handle_cookie_banner(page)
-
-        # Give extra time for page to settle after cookie handling
-        page.wait_for_timeout(3000)
+@metrics.timed("scrape.track_pages")
+def fetch_track_pages(track_urls, headless=True):
+    """Run the async track page pool from synchronous code, even while a sync Playwright session is open."""
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, fetch_all_track_data(
+            track_urls, headless=headless, storage_state=consent_storage_state())).result()
+
+@metrics.timed("scrape.browser_launch")
+def launch_browser(playwright, headless=True):
+    """Launch the Chromium browser used for scraping playlist pages."""
+    browser_args = ['--disable-web-security', '--disable-blink-features=AutomationControlled']
+    if lean_browser:
+        browser_args += LEAN_BROWSER_ARGS
+    
+    if not headless:
+        browser_args.append('--start-maximized')
         
+    return playwright.chromium.launch(
+        headless=headless,
+        args=browser_args
+    )
+
+def scrape_playlist(browser, url, headless=True, mode=extraction_mode, har_path=har_replay_path,
+                    on_track=None, storage_state=None, writer=None):
+    """Scrape one playlist in a new context of an already running browser, returning its track records.
+
+    on_track, if given, is called with each track record in playlist order as soon as
+    every track before it has been harvested (segments and gap re-fetches harvest out
+    of order), and writer, if given, gets each record with its playlist position.
+    storage_state lets the context start with cookies (such as an accepted cookie
+    banner) saved from an earlier context, and defaults to the consent state saved by
+    a previous run.
+    """
+    track_urls = []
+    track_data = []
+    in_order = PositionBuffer(on_track) if on_track else None
+    buffers = [buffer for buffer in (writer.order if writer else None, in_order) if buffer]
+    def emit_row(row):
+        record = track_records([row])[0]
+        if writer:
+            writer.write(record, row.get("index"))
+        if in_order:
+            in_order.put(record, row.get("index"))
+    def skip_rows(positions):
+        for buffer in buffers:
+            buffer.skip(positions)
+    emit_row = emit_row if buffers else None
+    skip_rows = skip_rows if buffers else None
+    network_store = TrackStore(on_track=emit_row, on_skip=skip_rows)
+    
+    context = browser.new_context(
+        viewport=(LEAN_VIEWPORT if lean_browser else {'width': 1920, 'height': 1080}) if headless else None,
+        user_agent=BROWSER_USER_AGENT,
+        storage_state=storage_state or consent_storage_state(),
+        reduced_motion="reduce" if lean_browser else None
+    )
+    if mode == "network" and har_path:
+        context.route_from_har(har_path, not_found="fallback")
+    if mode == "network" or lean_browser:
+        print("Blocking images, media, fonts and trackers ...")
+        context.route("**/*", block_heavy_resources)
+    if lean_browser:
+        context.add_init_script(NO_ANIMATIONS_SCRIPT)
+    
+    page = context.new_page()
+    transfer = watch_transfer(page)
+    
+    if mode == "network":
+        watch_playlist_responses(page, network_store)
+    
+    if not headless:
+        try:
+            page.set_viewport_size({'width': 1920, 'height': 1080})
+        except:
+            pass
+    
+    print("Loading playlist page ...")
+    with metrics.span("scrape.page_load"):
+        page.goto(url, timeout=30000)
+    
+    print("Handling cookie banner ...")
+    handle_cookie_banner(page)
+
+    with metrics.span("scrape.page_settle"):
         # Verify page is fully loaded by checking for key elements
         try:
             page.wait_for_selector('[data-testid="playlist-tracklist"], [data-testid="entityTitle"]', timeout=15000)
             print("Playlist page loaded successfully")
         except:
             print("Warning: Playlist elements not fully loaded, attempting to continue ...")
-        
-        if not headless:
-            page.bring_to_front()
+    
+    if not headless:
+        page.bring_to_front()
 
-        total_songs_playlist(page)
-        
+    song_total = total_songs_playlist(page)
+    
+    if mode == "network":
+        print("Scrolling to request the remaining playlist pages ...")
+        # Rendered rows are kept for positions whose response is never captured. The page
+        # hands each row over only once, so they have to be kept from this first scroll
+        rendered_store = TrackStore()
+        scroll_and_load_all_tracks(page, expected_total=song_total, store=rendered_store)
+        refetch_gaps(page, network_store, song_total, dom_store=rendered_store)
+        if network_store:
+            print(f"Successfully captured {len(network_store)} tracks from network responses")
+            track_data = track_records(network_store.ordered())
+        else:
+            print("No playlist responses captured, falling back to DOM extraction ...")
+    
+    if not track_data:
         print("Attempting to extract tracks from DOM ...")
         
         initial_meta = page.locator('meta[name="music:song"]').count()
         initial_dom = page.locator('[data-testid="tracklist-row"]').count()
         print(f"Initial track counts - Meta: {initial_meta}, DOM: {initial_dom}")
         
-        dom_tracks = get_tracks_from_dom(page)
-        
+        dom_store = TrackStore(on_track=emit_row, on_skip=skip_rows)
+        if len(segment_bounds(song_total)) > 1:
+            # Segments are harvested side by side, so every one after the first has to wait its turn
+            for buffer in buffers:
+                buffer.lookahead = None
+            dom_tracks = get_tracks_in_segments(page, url, song_total, dom_store, headless=headless)
+        else:
+            dom_tracks = get_tracks_from_dom(page, store=dom_store, expected_total=song_total)
+        refetch_gaps(page, dom_store, song_total)
+        dom_tracks = dom_store.ordered()
         if dom_tracks:
             print(f"Successfully extracted {len(dom_tracks)} tracks from DOM")
-            track_data = []
-            for track in dom_tracks:
-                track_data.append({
-                    "Title": track["title"],
-                    "Artist(s)": track["artists"],
-                    "URL": track["url"]
-                })
+            track_data = track_records(dom_tracks)
+    
+    if not track_data:
+        print("DOM extraction failed, trying metadata extraction ...")
+        scroll_and_load_all_tracks(page, expected_total=song_total, count_meta=True)
+        track_urls = get_track_urls(page)
+    
+    context.close()
+    if in_order:
+        in_order.flush()
+    print(f"Transferred {transfer['bytes'] / 1024 / 1024:.1f} MB in {transfer['requests']} requests "
+          f"({transfer['blocked']} blocked or failed)")
+
+    if track_urls:
+        print(f"Found {len(track_urls)} track URLs, fetching detailed data ...")
+        track_data = fetch_track_pages(track_urls, headless=headless)
+        for position, record in enumerate(track_data, 1):
+            if writer:
+                writer.write(record, position)
+            if on_track:
+                on_track(record)
+    elif not track_data:
+        print("No tracks found!")
+        return []
+
+    loaded_count = max(len(track_data), len(track_urls))
+    metrics.count("scrape.tracks", len(track_data))
+    if not song_total:
+        print(f"Could not get total nuber of songs. Skipping validation check ...")
+    else:
+        if song_total == loaded_count:
+            print("Validation successful - all tracks loaded")
         else:
-            print("DOM extraction failed, trying metadata extraction ...")
-            scroll_and_load_all_tracks(page)
-            track_urls = get_track_urls(page)
-            browser.close()
+            print(f"Validation failed, difference of {song_total - loaded_count} songs")
+    
+    return track_data
+
+def report_saved(writer):
+    """Finish the output files and say what was written."""
+    with metrics.span("scrape.save_output"):
+        count = writer.close()
+    if count:
+        print(f"Successfully saved {count} tracks to {writer.path}")
+        if writer.format == "csv" and writer.json_path:
+            print("Also saved as JSON backup")
+    else:
+        print("No track data was extracted!")
+
+def save_tracks(track_data, csv_path=None, json_path="spotify_playlist.json"):
+    """Write the scraped track records to the file used by the importer, plus a JSON backup for CSV output."""
+    columns = list(dict.fromkeys(column for record in track_data for column in record))
+    writer = TrackWriter(csv_path or output_file(), json_path, columns=columns)
+    for record in track_data:
+        writer.write(record)
+    report_saved(writer)
+
+def main(headless=True, mode=extraction_mode, har_path=har_replay_path, on_track=None):
+    """Main function to extract playlist data.
+
+    Tracks are written to the output file as soon as they are harvested, and on_track,
+    if given, is called with each track record at the same time.
+    """
+    # Network mode can fill a gap with a rendered row, which has no album, duration or ISRC
+    columns = list(TRACK_COLUMNS) if mode == "network" else None
+    writer = TrackWriter(output_file(), "spotify_playlist.json", columns=columns)
+    try:
+        if mode == "http":
+            from http_scraper import scrape_playlist_http
             
-            if not track_urls:
-                print("No tracks found!")
+            def emit(record):
+                writer.write(record)
+                if on_track:
+                    on_track(record)
+            if scrape_playlist_http(playlist_url, on_track=emit) is not None:
                 return
-            
-            print(f"Found {len(track_urls)} track URLs, fetching detailed data ...")
-            track_data = []
-            for index, url in enumerate(track_urls):
-                print(f"Progress: {index+1}/{len(track_urls)}")
-                info = fetch_track_data(playwright, url)
-                if info:
-                    track_data.append(info)
-                time.sleep(0.5)
-        
-        browser.close()
-
-        if not validation_check:
-            print(f"Could not get total nuber of songs. Skipping validation check ...")
-        else:
-            if song_count_total == current_count:
-                print("Validation successful - all tracks loaded")
-            else:
-                print(f"Validation failed, difference of {song_count_total - current_count} songs")
+            print("The page needs JavaScript to list every track, falling back to the browser ...")
+            mode = "dom"
         
-        if track_data:
-            df = pd.DataFrame(track_data)
-            df.to_csv("spotify_playlist.csv", index=False)
-            print(f"Successfully saved {len(df)} tracks to spotify_playlist.csv")
-            
-            with open("spotify_playlist.json", "w", encoding="utf-8") as f:
-                json.dump(track_data, f, indent=2, ensure_ascii=False)
-            print("Also saved as JSON backup")
-        else:
-            print("No track data was extracted!")
+        # Playwright is only loaded once a browser is actually needed
+        from playwright.sync_api import sync_playwright
+        with sync_playwright() as playwright:
+            browser = launch_browser(playwright, headless=headless)
+            try:
+                scrape_playlist(browser, playlist_url, headless=headless, mode=mode,
+                                har_path=har_path, on_track=on_track, writer=writer)
+            finally:
+                browser.close()
+    finally:
+        report_saved(writer)
 
 if __name__ == "__main__":
     main(headless=run_headless)
\ No newline at end of file
@@ -0,0 +1,184 @@
+import collections
+import threading
+import time
+
+class TokenBucket:
+    """Thread-safe token bucket shared by every API worker.
+
+    A 429 response pauses the whole bucket for the Retry-After period, so every worker
+    backs off together instead of each one hammering the API with its own retries.
+    """
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, rate or 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                elif not self.rate:
+                    return
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def set_rate(self, rate):
+        with self.lock:
+            self.rate = rate
+            self.capacity = max(1, rate or 1)
+            self.tokens = min(self.tokens, self.capacity)
+
+    def pause(self, seconds):
+        """Stop handing out tokens to every worker for the given number of seconds."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0
+            self.updated = self.paused_until
+
+class CircuitOpenError(Exception):
+    """Raised when the API is still failing after the circuit breaker has tripped too many times."""
+
+class AdaptiveThrottle:
+    """Adapts the request rate and the number of requests in flight to how the API responds.
+
+    Both grow additively with every successful request (the rate by about one request
+    per second each second) until the API pushes back, and a 429 halves both and pauses
+    every worker for the Retry-After period (AIMD). While latency is well above the
+    fastest seen, they stop growing. After breaker_threshold failures in a row the
+    breaker trips: all requests wait out the cooldown, then a single probe request
+    decides whether to carry on. Each trip without a success in between doubles the
+    cooldown. After max_trips of them, requests fail with CircuitOpenError for the
+    longest cooldown instead of waiting, and then a probe is let through again, so a
+    later job can carry on once the API recovers.
+    """
+    # Seconds of completed requests used for the effective requests per second
+    RATE_WINDOW = 10
+    # How many times the fastest smoothed latency counts as congested
+    LATENCY_FACTOR = 3
+
+    def __init__(self, rate, max_rate=None, max_concurrency=8, breaker_threshold=10, cooldown=30, max_trips=3,
+                 on_report=None, report_interval=10):
+        self.bucket = TokenBucket(rate)
+        self.max_rate = max(rate, max_rate or rate)
+        self.max_concurrency = max(1, max_concurrency)
+        self.concurrency = float(self.max_concurrency)
+        self.breaker_threshold = breaker_threshold
+        self.cooldown = cooldown
+        self.max_trips = max_trips
+        self.on_report = on_report
+        self.report_interval = report_interval
+        self.in_flight = 0
+        self.latency = None
+        self.fastest = None
+        self.last_decrease = 0.0
+        self.failures = 0
+        self.trips = 0
+        self.open_until = 0.0
+        self.probing = False
+        self.started = time.monotonic()
+        self.last_report = self.started
+        self.completed = collections.deque()
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        """Block until a request may be sent, then count it as in flight."""
+        with self.condition:
+            while True:
+                wait = self.open_until - time.monotonic()
+                if wait > 0 and self.trips > self.max_trips:
+                    raise CircuitOpenError(f"the API failed {self.breaker_threshold} times in a row after "
+                                           f"{self.max_trips} cooldowns, try again in {wait:.0f}s")
+                if wait > 0:
+                    self.condition.wait(wait)
+                elif (self.trips and self.probing) or self.in_flight >= int(self.concurrency):
+                    self.condition.wait()
+                else:
+                    break
+            # The first request after a cooldown is the probe, the rest wait for its outcome
+            self.probing = bool(self.trips)
+            self.in_flight += 1
+        self.bucket.acquire()
+
+    def release(self):
+        """Free the slot of a request that failed for a reason unrelated to API load."""
+        with self.condition:
+            self.in_flight -= 1
+            self.probing = False
+            self.condition.notify_all()
+
+    def success(self, seconds):
+        """Record a response that arrived in the given number of seconds."""
+        report = None
+        with self.condition:
+            now = time.monotonic()
+            self.in_flight -= 1
+            self.failures = self.trips = 0
+            self.probing = False
+            self.completed.append(now)
+            self.latency = seconds if self.latency is None else 0.8 * self.latency + 0.2 * seconds
+            self.fastest = min(self.fastest or self.latency, self.latency)
+            if self.latency <= self.LATENCY_FACTOR * self.fastest:
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+                if self.bucket.rate:
+                    self.bucket.set_rate(min(self.max_rate, self.bucket.rate + 1 / self.bucket.rate))
+            if self.on_report and now - self.last_report >= self.report_interval:
+                self.last_report = now
+                report = self.stats()
+            self.condition.notify_all()
+        if report:
+            self.on_report(report)
+
+    def failure(self, retry_after=None):
+        """Record a failed request. A Retry-After (from a 429) also slows every worker down."""
+        with self.condition:
+            now = time.monotonic()
+            self.in_flight -= 1
+            self.failures += 1
+            was_probe = self.probing
+            self.probing = False
+            if retry_after is not None:
+                self.bucket.pause(retry_after)
+                # Responses to requests sent before the first 429 arrive together, halve only once for them
+                if now - self.last_decrease > (self.latency or 1.0):
+                    self.last_decrease = now
+                    self.concurrency = max(1.0, self.concurrency / 2)
+                    if self.bucket.rate:
+                        self.bucket.set_rate(max(self.bucket.rate / 2, 0.5))
+            if was_probe or self.failures >= self.breaker_threshold:
+                self.failures = 0
+                self.trips = min(self.trips + 1, self.max_trips + 1)
+                self.open_until = now + self.cooldown * 2 ** (min(self.trips, self.max_trips) - 1)
+                if self.trips <= self.max_trips:
+                    print(f"API requests keep failing, pausing them all for {self.open_until - now:.0f}s ...")
+                else:
+                    print(f"API requests keep failing, failing them all for {self.open_until - now:.0f}s ...")
+            self.condition.notify_all()
+
+    def requests_per_second(self):
+        """Completed requests per second over the last RATE_WINDOW seconds."""
+        with self.condition:
+            now = time.monotonic()
+            while self.completed and self.completed[0] < now - self.RATE_WINDOW:
+                self.completed.popleft()
+            return len(self.completed) / max(min(self.RATE_WINDOW, now - self.started), 1e-3)
+
+    def stats(self):
+        return {
+            "requests_per_second": round(self.requests_per_second(), 2),
+            "rate_limit": round(self.bucket.rate, 2),
+            "concurrency": int(self.concurrency),
+            "latency_ms": round((self.latency or 0) * 1000, 1),
+            "breaker_open": self.open_until > time.monotonic()
+        }
@@ -0,0 +1,190 @@
+import json
+import csv
+import os
+
+from config import output_format
+
+# Known track columns in output order, with their Arrow types for the columnar formats
+TRACK_COLUMNS = {
+    "Title": "string",
+    "Artist(s)": "string",
+    "URL": "string",
+    "Album": "string",
+    "Duration (ms)": "int64",
+    "ISRC": "string"
+}
+
+# File extension used for each output format
+OUTPUT_EXTENSIONS = {"csv": ".csv", "parquet": ".parquet", "arrow": ".arrow"}
+
+# Number of rows buffered before a batch is written to a Parquet or Arrow file
+COLUMNAR_BATCH_SIZE = 1000
+
+# Most records held back behind a missing position before it is given up on
+POSITION_LOOKAHEAD = 1000
+
+def output_file(base="spotify_playlist", fmt=output_format):
+    """The path the scraper writes to and the importer reads from for the given format."""
+    return base + OUTPUT_EXTENSIONS.get(fmt, ".csv")
+
+def format_of(path):
+    extension = os.path.splitext(path)[1].lower()
+    return next((fmt for fmt, ext in OUTPUT_EXTENSIONS.items() if ext == extension), "csv")
+
+def import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet and Arrow output need pyarrow, install it with: pip install pyarrow")
+    return pyarrow
+
+class PositionBuffer:
+    """Pass records on in 1-based position order as they arrive out of order.
+
+    Only the records that arrive ahead of a missing position are held back. A missing
+    position is passed over once it is skipped (it will never come), or once more than
+    lookahead records are waiting behind it (None waits for it until flush). Records
+    without a position, or for a position already passed over, go straight through.
+    """
+    def __init__(self, emit, lookahead=POSITION_LOOKAHEAD):
+        self.emit = emit
+        self.lookahead = lookahead
+        self.next_position = 1
+        self.waiting = {}
+        self.skipped = set()
+
+    def put(self, record, position=None):
+        if position is None or position < self.next_position:
+            self.emit(record)
+            return
+        self.waiting[position] = record
+        self.advance()
+
+    def skip(self, positions):
+        """Stop waiting for positions that will never arrive."""
+        self.skipped.update(position for position in positions if position >= self.next_position)
+        self.advance()
+
+    def advance(self):
+        while True:
+            if self.next_position in self.waiting:
+                self.emit(self.waiting.pop(self.next_position))
+            elif self.next_position in self.skipped:
+                self.skipped.discard(self.next_position)
+            elif self.lookahead is not None and len(self.waiting) > self.lookahead:
+                self.next_position = min(self.waiting)
+                continue
+            else:
+                break
+            self.next_position += 1
+
+    def flush(self):
+        """Pass on the records still waiting for an earlier position that never came."""
+        for position in sorted(self.waiting):
+            self.emit(self.waiting[position])
+        self.waiting = {}
+        self.skipped = set()
+
+class TrackWriter:
+    """Write track records to disk as they arrive instead of all at once at the end.
+
+    The format follows the file extension: .csv (with a JSON backup next to it, when
+    json_path is given), .parquet or .arrow (Arrow IPC file, readable memory-mapped).
+    Columns are taken from the first record unless they are given up front. Records
+    written with a position are put in 1-based position order through a PositionBuffer;
+    records without one are written as they come.
+    """
+    def __init__(self, path, json_path=None, columns=None):
+        self.path = path
+        self.json_path = json_path
+        self.format = format_of(path)
+        self.fixed_columns = columns
+        self.columns = None
+        self.count = 0
+        self.order = PositionBuffer(self.emit)
+        self.batch = []
+        self.file = None
+        self.writer = None
+        self.json_file = None
+
+    def open(self, record):
+        keys = self.fixed_columns or record
+        self.columns = [column for column in TRACK_COLUMNS if column in keys]
+        self.columns += [column for column in keys if column not in TRACK_COLUMNS]
+        if self.format == "csv":
+            self.file = open(self.path, "w", newline="", encoding="utf-8")
+            self.writer = csv.DictWriter(self.file, fieldnames=self.columns, restval="", extrasaction="ignore")
+            self.writer.writeheader()
+            if self.json_path:
+                self.json_file = open(self.json_path, "w", encoding="utf-8")
+                self.json_file.write("[")
+        else:
+            pyarrow = import_pyarrow()
+            self.schema = pyarrow.schema([(column, TRACK_COLUMNS.get(column, "string")) for column in self.columns])
+            if self.format == "parquet":
+                self.writer = pyarrow.parquet.ParquetWriter(self.path, self.schema)
+            else:
+                self.writer = pyarrow.ipc.new_file(self.path, self.schema)
+
+    def write(self, record, position=None):
+        self.order.put(record, position)
+
+    def skip(self, positions):
+        """Write the records held back for positions that will never arrive."""
+        self.order.skip(positions)
+
+    def emit(self, record):
+        if self.columns is None:
+            self.open(record)
+        self.count += 1
+        if self.format == "csv":
+            self.writer.writerow(record)
+            if self.json_file:
+                # Same layout as json.dump(records, indent=2), one record at a time
+                entry = json.dumps(record, indent=2, ensure_ascii=False).replace("\n", "\n  ")
+                self.json_file.write(("," if self.count > 1 else "") + "\n  " + entry)
+        else:
+            self.batch.append(record)
+            if len(self.batch) >= COLUMNAR_BATCH_SIZE:
+                self.flush_batch()
+
+    def flush_batch(self):
+        if self.batch:
+            pyarrow = import_pyarrow()
+            columns = {column: [record.get(column) for record in self.batch] for column in self.columns}
+            self.writer.write_batch(pyarrow.RecordBatch.from_pydict(columns, schema=self.schema))
+            self.batch = []
+
+    def close(self):
+        """Write any records still waiting for an earlier position, then finish the files."""
+        self.order.flush()
+        if self.format != "csv" and self.writer:
+            self.flush_batch()
+            self.writer.close()
+        if self.file:
+            self.file.close()
+        if self.json_file:
+            self.json_file.write("\n]" if self.count else "]")
+            self.json_file.close()
+        return self.count
+
+def read_tracks(path, batch_size=COLUMNAR_BATCH_SIZE):
+    """Yield the track records of a file written by TrackWriter, a batch at a time."""
+    fmt = format_of(path)
+    if fmt == "csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+        return
+
+    pyarrow = import_pyarrow()
+    if fmt == "parquet":
+        batches = pyarrow.parquet.ParquetFile(path, memory_map=True).iter_batches(batch_size=batch_size)
+        for batch in batches:
+            yield from batch.to_pylist()
+    else:
+        with pyarrow.memory_map(path) as source:
+            reader = pyarrow.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield from reader.get_batch(i).to_pylist()